@@ -0,0 +1,94 @@
+"""
+Incrementally maintained lead counters for /stats and /conference-roi.
+
+The write paths (/sync inserts, background promotions, /process-audio) feed
+every lead row they touch into lead_aggregates.apply(), which adjusts the
+per-status counts and per-conference Won revenue by the difference from
+the lead's previous snapshot. Reads are dictionary lookups.
+
+Each API process keeps its own copy and does not see writes made by other
+processes (or directly in the database) until the periodic full
+recompute replaces it, so counts can lag by up to one reconcile interval.
+"""
+import os
+from collections import Counter, defaultdict
+
+from rebuild import RebuildableIndex
+
+AGGREGATES_RECONCILE_SECONDS = float(os.environ.get("AGGREGATES_RECONCILE_SECONDS", "300"))
+
+HOT_STATUSES = ("Qualified", "Won")
+
+class LeadAggregates(RebuildableIndex):
+    def __init__(self):
+        self._leads: dict[str, tuple[str, str | None, float]] = {}
+        self._status_counts: Counter = Counter()
+        self._won_revenue: defaultdict[str, float] = defaultdict(float)
+        self._won_count: Counter = Counter()
+
+    def _add(self, snapshot: tuple[str, str | None, float], sign: int):
+        status, conference_id, revenue = snapshot
+        self._status_counts[status] += sign
+        if status == "Won" and conference_id:
+            self._won_revenue[conference_id] += sign * revenue
+            self._won_count[conference_id] += sign
+
+    def apply(self, lead: dict):
+        """
+        Records a lead's current state. Keys missing from lead keep their
+        previous value, so partial rows such as {"id": ..., "status": ...} work.
+        """
+        if not lead.get("id"):
+            return
+        self._log_write(lead)
+        lead_id = str(lead["id"])
+        previous = self._leads.get(lead_id)
+        old_status, old_conference, old_revenue = previous or ("New", None, 0.0)
+        status = (lead.get("status") or old_status) if "status" in lead else old_status
+        if "conference_id" in lead:
+            conference_id = str(lead["conference_id"]) if lead["conference_id"] else None
+        else:
+            conference_id = old_conference
+        revenue = float(lead.get("revenue") or 0) if "revenue" in lead else old_revenue
+        snapshot = (status, conference_id, revenue)
+        if previous == snapshot:
+            return
+        if previous is not None:
+            self._add(previous, -1)
+        self._add(snapshot, 1)
+        self._leads[lead_id] = snapshot
+
+    def remove(self, lead_id: str):
+        previous = self._leads.pop(str(lead_id), None)
+        if previous is not None:
+            self._add(previous, -1)
+
+    def _adopt(self, fresh: "LeadAggregates"):
+        self._leads = fresh._leads
+        self._status_counts = fresh._status_counts
+        self._won_revenue = fresh._won_revenue
+        self._won_count = fresh._won_count
+
+    def _replay(self, lead: dict):
+        self.apply(lead)
+
+    def counts(self) -> dict:
+        return {
+            "total_leads": len(self._leads),
+            "hot_leads": sum(self._status_counts[status] for status in HOT_STATUSES),
+            "meetings_scheduled": self._status_counts["Meeting"]
+        }
+
+    def conference_revenue(self, conference_id: str) -> float:
+        return self._won_revenue.get(str(conference_id), 0.0)
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "leads": len(self._leads),
+            "status_counts": {status: count for status, count in self._status_counts.items() if count},
+            "conferences": len(self._won_count),
+            "reconciled_at": self.reconciled_at
+        }
+
+lead_aggregates = LeadAggregates()
@@ -0,0 +1,88 @@
+"""
+In-process job registry for asynchronous /process-audio requests.
+
+A job wraps one audio pipeline run. At most AUDIO_JOB_CONCURRENCY pipelines
+run at once; the rest wait in line, and submissions beyond
+AUDIO_JOB_QUEUE_LIMIT pending jobs are refused. Finished jobs are kept for
+AUDIO_JOB_TTL seconds so clients can poll GET /jobs/{id}.
+"""
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+
+AUDIO_JOB_CONCURRENCY = int(os.environ.get("AUDIO_JOB_CONCURRENCY", "2"))
+AUDIO_JOB_QUEUE_LIMIT = int(os.environ.get("AUDIO_JOB_QUEUE_LIMIT", "100"))
+AUDIO_JOB_TTL = float(os.environ.get("AUDIO_JOB_TTL", "3600"))
+
+jobs: dict[str, dict] = {}
+_finished_at: dict[str, float] = {}
+_tasks: set[asyncio.Task] = set()
+_semaphore: asyncio.Semaphore = None
+
+class JobQueueFull(Exception):
+    pass
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def _prune():
+    cutoff = time.monotonic() - AUDIO_JOB_TTL
+    for job_id in [job_id for job_id, finished in _finished_at.items() if finished < cutoff]:
+        jobs.pop(job_id, None)
+        _finished_at.pop(job_id, None)
+
+def pending_count() -> int:
+    return sum(1 for job in jobs.values() if job["status"] in ("queued", "running"))
+
+def submit(pipeline: Callable[[], Awaitable[dict]], **info) -> dict:
+    """Schedules pipeline() on the event loop and returns the new job record."""
+    global _semaphore
+    _prune()
+    if pending_count() >= AUDIO_JOB_QUEUE_LIMIT:
+        raise JobQueueFull(f"{AUDIO_JOB_QUEUE_LIMIT} audio jobs already pending")
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(AUDIO_JOB_CONCURRENCY)
+
+    job = {
+        "id": str(uuid.uuid4()),
+        "status": "queued",
+        "created_at": _now(),
+        "started_at": None,
+        "finished_at": None,
+        "result": None,
+        "error": None,
+        **info
+    }
+    jobs[job["id"]] = job
+    task = asyncio.create_task(_run(job, pipeline))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return job
+
+async def _run(job: dict, pipeline: Callable[[], Awaitable[dict]]):
+    async with _semaphore:
+        job["status"] = "running"
+        job["started_at"] = _now()
+        try:
+            job["result"] = await pipeline()
+            job["status"] = "completed"
+        except Exception as e:
+            # HTTPException carries its message in .detail
+            job["error"] = getattr(e, "detail", None) or str(e)
+            job["status"] = "failed"
+            print(f"❌ [Audio Job {job['id']}] Failed: {job['error']}")
+        finally:
+            job["finished_at"] = _now()
+            _finished_at[job["id"]] = time.monotonic()
+
+def get_job(job_id: str) -> dict | None:
+    _prune()
+    return jobs.get(job_id)
+
+async def shutdown():
+    for task in list(_tasks):
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
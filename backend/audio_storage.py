@@ -0,0 +1,152 @@
+"""
+Content-addressed storage for uploaded recordings.
+
+Uploads are streamed in chunks into UPLOAD_DIR/tmp, hashed on the way and
+rejected as soon as they pass MAX_UPLOAD_BYTES. Accepted files are moved to
+UPLOAD_DIR/<aa>/<bb>/<sha256><ext>, so re-uploads of one recording share a
+single file and no client-supplied name ever reaches the filesystem.
+
+Each pipeline run reads its own hard link in UPLOAD_DIR/runs, so workers
+sharing the directory never delete a file another one is reading: removing
+a name leaves the audio in place for the other links.
+
+Audio is transient: once its transcript is cached the pipeline releases it
+and the file is deleted (AUDIO_DELETE_AFTER_TRANSCRIPT). A periodic sweep
+removes anything older than AUDIO_RETENTION_SECONDS that is not in use,
+including files left behind by crashes.
+"""
+import asyncio
+import hashlib
+import os
+import time
+import uuid
+
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", "uploads")
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+AUDIO_DELETE_AFTER_TRANSCRIPT = os.environ.get("AUDIO_DELETE_AFTER_TRANSCRIPT", "true").lower() != "false"
+AUDIO_RETENTION_SECONDS = float(os.environ.get("AUDIO_RETENTION_SECONDS", str(24 * 3600)))
+AUDIO_GC_INTERVAL = float(os.environ.get("AUDIO_GC_INTERVAL", "3600"))
+
+AUDIO_EXTENSIONS = {".webm", ".wav", ".mp3", ".m4a", ".mp4", ".ogg", ".oga", ".opus", ".aac", ".flac", ".amr", ".3gp"}
+
+# This process's run links -> their content-addressed path, so the sweep leaves them alone.
+_in_use: dict[str, str] = {}
+
+class UploadTooLarge(Exception):
+    pass
+
+def _extension(filename: str | None) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ext if ext in AUDIO_EXTENSIONS else ".bin"
+
+def path_for(audio_hash: str, ext: str) -> str:
+    return os.path.join(UPLOAD_DIR, audio_hash[:2], audio_hash[2:4], f"{audio_hash}{ext}")
+
+def _place(tmp_path: str, file_path: str, attempts: int = 3):
+    """Moves tmp_path to file_path, recreating the shard directory if the sweep removed it in between."""
+    for attempt in range(attempts):
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        try:
+            os.replace(tmp_path, file_path)
+            return
+        except FileNotFoundError:
+            if attempt == attempts - 1:
+                raise
+
+def save(fileobj, filename: str | None, declared_size: int | None = None) -> tuple[str, str]:
+    """
+    Streams fileobj to its content-addressed path. Returns (run_path,
+    sha256 hex digest), where run_path is a link to the audio that only
+    this pipeline uses, until release(). Raises UploadTooLarge past
+    MAX_UPLOAD_BYTES.
+    """
+    if declared_size is not None and declared_size > MAX_UPLOAD_BYTES:
+        raise UploadTooLarge(f"Upload exceeds {MAX_UPLOAD_BYTES} bytes")
+
+    tmp_dir = os.path.join(UPLOAD_DIR, "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, f"{uuid.uuid4()}.part")
+
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        with open(tmp_path, "wb") as buffer:
+            while chunk := fileobj.read(UPLOAD_CHUNK_SIZE):
+                written += len(chunk)
+                if written > MAX_UPLOAD_BYTES:
+                    raise UploadTooLarge(f"Upload exceeds {MAX_UPLOAD_BYTES} bytes")
+                digest.update(chunk)
+                buffer.write(chunk)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    audio_hash = digest.hexdigest()
+    ext = _extension(filename)
+    file_path = path_for(audio_hash, ext)
+    runs_dir = os.path.join(UPLOAD_DIR, "runs")
+    os.makedirs(runs_dir, exist_ok=True)
+    run_path = os.path.join(runs_dir, f"{uuid.uuid4()}{ext}")
+    try:
+        os.link(tmp_path, run_path)
+        # Replacing an earlier copy of the same recording is harmless: runs
+        # reading it hold their own links.
+        _place(tmp_path, file_path)
+    except BaseException:
+        for path in [tmp_path, run_path]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        raise
+
+    _in_use[run_path] = file_path
+    return run_path, audio_hash
+
+def release(run_path: str, transcript_stored: bool):
+    """
+    Removes the pipeline's own link to the audio, and the content-addressed
+    copy once its transcript is stored.
+    """
+    file_path = _in_use.pop(run_path, None)
+    paths = [run_path]
+    if file_path and transcript_stored and AUDIO_DELETE_AFTER_TRANSCRIPT:
+        paths.append(file_path)
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def collect_garbage() -> int:
+    """Deletes unused audio older than AUDIO_RETENTION_SECONDS. Returns files removed."""
+    if not os.path.isdir(UPLOAD_DIR):
+        return 0
+    cutoff = time.time() - AUDIO_RETENTION_SECONDS
+    keep_dirs = {UPLOAD_DIR, os.path.join(UPLOAD_DIR, "tmp"), os.path.join(UPLOAD_DIR, "runs")}
+    removed = 0
+    for root, dirs, files in os.walk(UPLOAD_DIR, topdown=False):
+        for name in files:
+            path = os.path.join(root, name)
+            if path in _in_use:
+                continue
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        if root not in keep_dirs and not os.listdir(root):
+            os.rmdir(root)
+    return removed
+
+async def run_garbage_collector():
+    while True:
+        try:
+            removed = await asyncio.to_thread(collect_garbage)
+            if removed:
+                print(f"🧹 [Audio GC] Removed {removed} expired recordings.")
+        except Exception as e:
+            print(f"⚠️ [Audio GC] Sweep failed: {e}")
+        await asyncio.sleep(AUDIO_GC_INTERVAL)
@@ -0,0 +1,95 @@
+"""
+Times DedupIndex against a brute-force rapidfuzz scan of every lead.
+
+    python bench_dedup.py [--leads 100000] [--queries 5000]
+
+Queries mix reformatted phones, exact, re-cased or +tagged emails, misspelt names
+of existing leads and brand-new people.
+"""
+import argparse
+import random
+import time
+
+from rapidfuzz import fuzz, process
+
+from dedup import DedupIndex, DEDUP_NAME_THRESHOLD, normalize_name
+
+FIRST = ["Amit", "Rahul", "Priya", "Sneha", "Vikram", "Anjali", "Rohan", "Kavya", "Arjun", "Neha",
+         "Suresh", "Meera", "Karan", "Pooja", "Aditya", "Divya", "Manish", "Ritu", "Sanjay", "Isha"]
+# Surnames built from syllables so the name space is about as varied as a real lead list.
+SYLLABLES = ["ka", "ma", "ra", "sha", "pa", "de", "jo", "na", "ti", "va", "la", "go", "ba", "chi", "ya",
+             "su", "ha", "ni", "ko", "da", "ri", "bha", "ge", "mi", "to", "lu", "wa", "the", "sa", "pu"]
+
+def make_leads(count: int, rng: random.Random) -> list[dict]:
+    leads = []
+    for i in range(count):
+        surname = "".join(rng.choice(SYLLABLES) for _ in range(rng.choice([2, 3]))).capitalize()
+        name = f"{rng.choice(FIRST)} {surname}"
+        leads.append({
+            "id": f"lead-{i}",
+            "name": name,
+            "email": f"user{i}@gmail.com",
+            "phone": f"9{rng.randrange(10**9):09d}",
+            "company": rng.choice(["Tesla", "Infosys", "TCS", "Wipro", "HDFC", None])
+        })
+    return leads
+
+def misspell(name: str, rng: random.Random) -> str:
+    chars = list(name)
+    i = rng.randrange(1, len(chars) - 1)
+    chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    return "".join(chars)
+
+def make_queries(leads: list[dict], count: int, rng: random.Random) -> list[dict]:
+    queries = []
+    for i in range(count):
+        lead = rng.choice(leads)
+        kind = i % 4
+        if kind == 0:
+            phone = lead["phone"]
+            queries.append({"name": "Someone Else", "phone": f"+91 {phone[:5]}-{phone[5:]}"})
+        elif kind == 1:
+            email = lead["email"] if i % 8 == 1 else lead["email"].upper().replace("@", "+conf@")
+            queries.append({"name": "Someone Else", "email": email})
+        elif kind == 2:
+            queries.append({"name": misspell(lead["name"], rng), "company": lead["company"]})
+        else:
+            queries.append({"name": f"New Person {i}", "phone": f"8{rng.randrange(10**9):09d}"})
+    return queries
+
+def brute_force(choices: dict[str, str], query: dict):
+    return process.extractOne(normalize_name(query["name"]), choices, scorer=fuzz.token_sort_ratio, score_cutoff=DEDUP_NAME_THRESHOLD)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leads", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=5000)
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    leads = make_leads(args.leads, rng)
+    queries = make_queries(leads, args.queries, rng)
+
+    index = DedupIndex()
+    started = time.perf_counter()
+    for lead in leads:
+        index.add(lead)
+    build = time.perf_counter() - started
+    print(f"Indexed {len(index)} leads in {build:.2f}s ({build / len(index) * 1e6:.1f}µs/lead), {index.stats()['name_blocks']} name blocks")
+
+    started = time.perf_counter()
+    results = [index.match(query) for query in queries]
+    elapsed = time.perf_counter() - started
+    reasons = {}
+    for result in results:
+        reason = result["reason"] if result else "none"
+        reasons[reason] = reasons.get(reason, 0) + 1
+    print(f"Matched {len(queries)} leads in {elapsed:.3f}s ({elapsed / len(queries) * 1e6:.1f}µs/lead): {reasons}")
+
+    sample = queries[2::4][:20]
+    choices = {lead["id"]: normalize_name(lead["name"]) for lead in leads}
+    started = time.perf_counter()
+    for query in sample:
+        brute_force(choices, query)
+    brute = (time.perf_counter() - started) / len(sample)
+    print(f"Brute-force name scan: {brute * 1e3:.1f}ms/lead ({brute / (elapsed / len(queries)):.0f}x slower)")
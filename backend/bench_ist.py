@@ -0,0 +1,77 @@
+"""
+Checks the IST formatter in ist.py against the zoneinfo/strftime version
+it replaced, and times both on a /leads-sized list.
+
+    python bench_ist.py [--leads 100000] [--distinct 20000]
+
+--distinct is how many different timestamps the rows share, as leads
+captured in one /sync batch or conference do.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from ist import to_ist, convert_times
+
+def zoneinfo_to_ist(utc_str: str) -> str:
+    """The previous main.to_ist."""
+    if not utc_str: return utc_str
+    try:
+        dt = datetime.fromisoformat(utc_str.replace("Z", "+00:00"))
+        ist_dt = dt.astimezone(ZoneInfo("Asia/Kolkata"))
+        return ist_dt.strftime("%Y-%m-%d %H:%M:%S IST")
+    except:
+        return utc_str
+
+EDGE_CASES = [
+    "2024-02-28T18:30:00+00:00", "2024-02-29T18:29:59.999999+00:00", "2023-12-31T23:59:59Z",
+    "2024-01-01T00:00:00", "2024-01-01 10:00:00+00", "2024-06-01T10:00:00+05:30", "2024-06-01T10:00:00-04:00",
+    "2024-02-30T10:00:00+00:00", "2024-01-01T24:00:00+00:00", "not a date", "", None
+]
+
+def make_timestamps(count: int, rng: random.Random) -> list[str]:
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    stamps = []
+    for _ in range(count):
+        moment = start + timedelta(seconds=rng.randrange(3 * 365 * 86400), microseconds=rng.randrange(10**6))
+        stamps.append(moment.isoformat(timespec=rng.choice(["seconds", "milliseconds", "microseconds"])))
+    return stamps
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leads", type=int, default=100000)
+    parser.add_argument("--distinct", type=int, default=20000)
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    stamps = make_timestamps(args.distinct, rng)
+    mismatches = [value for value in stamps + EDGE_CASES if to_ist(value) != zoneinfo_to_ist(value)]
+    assert not mismatches, f"IST mismatches: {mismatches[:5]}"
+    print(f"✅ {len(stamps) + len(EDGE_CASES)} timestamps match the zoneinfo version")
+
+    rows = [{"captured_at": rng.choice(stamps), "created_at": rng.choice(stamps)} for _ in range(args.leads)]
+
+    started = time.perf_counter()
+    for row in rows:
+        zoneinfo_to_ist(row["captured_at"])
+        zoneinfo_to_ist(row["created_at"])
+    before = time.perf_counter() - started
+    print(f"zoneinfo + strftime per row: {before:.3f}s ({before / len(rows) * 1e6:.2f}µs/lead)")
+
+    to_ist.cache_clear()
+    started = time.perf_counter()
+    for value in stamps:
+        to_ist(value)
+    parse_only = time.perf_counter() - started
+    print(f"to_ist, uncached: {parse_only / len(stamps) * 1e6:.2f}µs/timestamp")
+
+    for label in ["cold", "warm"]:
+        if label == "cold":
+            to_ist.cache_clear()
+        batch = [dict(row) for row in rows]
+        started = time.perf_counter()
+        convert_times(batch)
+        after = time.perf_counter() - started
+        print(f"convert_times, {label} cache: {after:.3f}s ({after / len(rows) * 1e6:.2f}µs/lead, {before / after:.1f}x faster)")
@@ -0,0 +1,91 @@
+"""
+Times the JSON work of a lead list response before and after the orjson
+layer in fastjson.py.
+
+    python bench_json.py [--leads 10000] [--rounds 5]
+
+Outbound compares FastAPI's default path (jsonable_encoder, then
+json.dumps in JSONResponse) with handing the rows to ORJSONResponse.
+Inbound compares httpx's Response.json() with json_body() on a PostgREST
+body of the same rows.
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from fastjson import ORJSONResponse, json_body, raw_json
+
+STATUSES = ["New", "Contacted", "Follow-up", "Qualified", "Meeting", "Won", "Lost"]
+
+def make_leads(count: int, rng: random.Random) -> list[dict]:
+    """Rows shaped like select=* on leads, after IST conversion."""
+    leads = []
+    for i in range(count):
+        leads.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "name": f"Lead {i}",
+            "email": f"lead{i}@example.com",
+            "phone": f"9{rng.randrange(10**9):09d}",
+            "company": rng.choice(["Tesla", "Infosys", "TCS", "Wipro", "HDFC", None]),
+            "role": rng.choice(["CFO", "Founder", "Director", None]),
+            "notes": rng.choice(["HNI client, wants a portfolio review", "met at JITO", "call later", None]),
+            "status": rng.choice(STATUSES),
+            "reminder_date": None,
+            "owner_id": "00000000-0000-0000-0000-000000000000",
+            "captured_at": "2024-02-14 17:30:00 IST",
+            "created_at": "2024-02-14 17:31:12 IST",
+            "updated_at": "2024-02-15T09:12:44.120391+00:00",
+            "social_media_json": {"linkedin": f"https://linkedin.com/in/lead{i}"},
+            "meta_data": {
+                "ticket_size": rng.choice(["< 10L", "10L - 50L", "50L - 1Cr", "> 1Cr"]),
+                "lead_score": rng.randrange(100),
+                "predicted_aua": rng.randrange(10**7),
+                "readiness_score": rng.randrange(100),
+                "is_hot": rng.random() < 0.3
+            },
+            "revenue": round(rng.random() * 10**6, 2),
+            "conference_id": None
+        })
+    return leads
+
+def best_of(rounds: int, fn) -> float:
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leads", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    leads = make_leads(args.leads, random.Random(42))
+    before_body = JSONResponse(jsonable_encoder(leads)).body
+    after_body = ORJSONResponse(leads).body
+    assert json.loads(before_body) == json.loads(after_body), "orjson output differs"
+    postgrest = httpx.Response(200, content=json.dumps(leads).encode(), headers={"Content-Type": "application/json"})
+    assert json_body(postgrest) == postgrest.json()
+
+    per = 10000 / args.leads * 1e3
+    results = [
+        ("Response: jsonable_encoder + json.dumps", lambda: JSONResponse(jsonable_encoder(leads))),
+        ("Response: ORJSONResponse", lambda: ORJSONResponse(leads)),
+        ("Response: raw PostgREST bytes", lambda: raw_json(postgrest.content)),
+        ("Parse: httpx Response.json()", postgrest.json),
+        ("Parse: json_body (orjson)", lambda: json_body(postgrest))
+    ]
+    timings = {}
+    for label, fn in results:
+        timings[label] = best_of(args.rounds, fn)
+        print(f"{label:42s} {timings[label] * per:8.2f}ms per 10k leads")
+    print(f"Body size: {len(before_body) / 1024:.0f}KB before, {len(after_body) / 1024:.0f}KB after")
+    print(f"Serialization {timings[results[0][0]] / timings[results[1][0]]:.1f}x faster, parsing {timings[results[3][0]] / timings[results[4][0]]:.1f}x faster")
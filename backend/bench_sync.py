@@ -0,0 +1,148 @@
+"""
+Compares per-lead and bulk /sync inserts against a local PostgREST stand-in.
+
+    python bench_sync.py [--latency-ms 2]
+
+The stand-in keeps leads in memory, enforces the leads_email_unique and
+primary key constraints, honours on_conflict / resolution=ignore-duplicates
+for array inserts and answers the id=in.(...) lookup. --latency-ms adds a
+fixed delay per request to model the round trip to Supabase.
+
+The "retry" case resends a batch whose first half already synced, as a
+device does after losing its connection mid-sync.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import httpx
+
+from utils import insert_leads_bulk, insert_leads_individually
+
+
+class FakePostgREST(BaseHTTPRequestHandler):
+    leads = {}
+    emails = set()
+    lock = threading.Lock()
+    latency = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        url = urlparse(self.path)
+        ids = parse_qs(url.query).get("id", ["in.()"])[0][len("in.("):-1].split(",")
+        with self.lock:
+            self._reply(200, [{"id": lead_id} for lead_id in ids if lead_id in self.leads])
+
+    def do_POST(self):
+        time.sleep(self.latency)
+        url = urlparse(self.path)
+        if url.path != "/rest/v1/leads":
+            return self._reply(404, {"message": "not found"})
+
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        params = parse_qs(url.query)
+        ignore_duplicates = "resolution=ignore-duplicates" in self.headers.get("Prefer", "")
+        on_conflict = params.get("on_conflict", [None])[0]
+        rows = body if isinstance(body, list) else [body]
+
+        with self.lock:
+            inserted = []
+            pending_ids = set()
+            pending_emails = set()
+            for row in rows:
+                row = {**row, "id": row.get("id") or str(uuid.uuid4())}
+                email = row.get("email")
+                if email and (email in self.emails or email in pending_emails):
+                    if ignore_duplicates and on_conflict == "email":
+                        continue
+                    return self._reply(409, {"code": "23505", "message": "leads_email_unique"})
+                if row["id"] in self.leads or row["id"] in pending_ids:
+                    return self._reply(409, {"code": "23505", "message": "leads_pkey"})
+                pending_ids.add(row["id"])
+                if email:
+                    pending_emails.add(email)
+                inserted.append(row)
+
+            for row in inserted:
+                self.leads[row["id"]] = row
+                if row.get("email"):
+                    self.emails.add(row["email"])
+        self._reply(201, inserted)
+
+    @classmethod
+    def reset(cls):
+        with cls.lock:
+            cls.leads = {}
+            cls.emails = set()
+
+
+def make_rows(count: int, duplicate_every: int = 10) -> list[dict]:
+    rows = []
+    for i in range(count):
+        # Every Nth lead reuses an earlier email to exercise the duplicate path.
+        email_index = i - 1 if duplicate_every and i and i % duplicate_every == 0 else i
+        rows.append({
+            "id": str(uuid.uuid4()),
+            "name": f"Bench Lead {i}",
+            "email": f"bench_{email_index}@example.com",
+            "phone": f"98{i:08d}",
+            "status": "New",
+            "meta_data": {"source": "bench", "predicted_aua": 0, "readiness_score": 40}
+        })
+    return rows
+
+
+async def run(insert, client: httpx.AsyncClient, rest_url: str, rows: list[dict], synced: list[dict]):
+    FakePostgREST.reset()
+    for row in synced:
+        FakePostgREST.leads[row["id"]] = row
+        FakePostgREST.emails.add(row["email"])
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        saved, skipped = await insert(client, rest_url, {"Content-Type": "application/json", "Prefer": "return=representation"}, rows)
+    return time.perf_counter() - started, len(saved), skipped
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    parser.add_argument("--sizes", default="10,100,1000")
+    args = parser.parse_args()
+
+    FakePostgREST.latency = args.latency_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakePostgREST)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    rest_url = f"http://127.0.0.1:{server.server_port}/rest/v1/leads"
+
+    print(f"PostgREST stand-in on {rest_url} (latency {args.latency_ms}ms/request)")
+    print(f"{'leads':>6} {'case':>6} {'mode':>11} {'seconds':>9} {'leads/s':>10} {'saved':>6} {'skipped':>8}")
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        for size in [int(s) for s in args.sizes.split(",")]:
+            rows = make_rows(size)
+            for case, synced in [("fresh", []), ("retry", rows[:size // 2])]:
+                for mode, insert in [("per-lead", insert_leads_individually), ("bulk", insert_leads_bulk)]:
+                    elapsed, saved, skipped = await run(insert, client, rest_url, rows, synced)
+                    print(f"{size:>6} {case:>6} {mode:>11} {elapsed:>9.3f} {size / elapsed:>10.0f} {saved:>6} {skipped:>8}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""
+Times /sync request validation before and after the TypeAdapter path.
+
+    python bench_validation.py [--leads 1000] [--rounds 5]
+
+Before: json.loads, SyncRequest validation with EmailStr, then one
+model_dump per lead, as FastAPI and the old prepare_lead_row did. After:
+SYNC_REQUEST.validate_json on the raw bytes with memoized email checks,
+then one SYNC_LEADS.dump_python for the batch. Both must produce the same
+rows.
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+from typing import List, Optional
+
+from pydantic import BaseModel, EmailStr
+
+from models import LeadCreate, SYNC_REQUEST, SYNC_LEADS, normalize_email_address
+
+class EmailStrLead(LeadCreate):
+    email: Optional[EmailStr] = None
+
+class EmailStrSyncRequest(BaseModel):
+    leads: List[EmailStrLead]
+
+def make_body(count: int, rng: random.Random) -> bytes:
+    leads = []
+    for i in range(count):
+        leads.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "name": f"Lead {i}",
+            # Devices resend leads they could not sync, so addresses repeat across batches.
+            "email": f"Lead{rng.randrange(count)}@Example.com",
+            "phone": f"+91 9{rng.randrange(10**9):09d}",
+            "company": rng.choice(["Tesla", "Infosys", "TCS", None]),
+            "notes": rng.choice(["HNI client, wants a portfolio review", "met at JITO", None]),
+            "status": rng.choice(["New", "Follow-up", "Hot"]),
+            "captured_at": "2024-02-14T12:00:00Z",
+            "social_media": {"linkedin": f"https://linkedin.com/in/lead{i}"},
+            "meta_data": {"ticket_size": rng.choice(["< 10L", "50L - 1Cr"])}
+        })
+    return json.dumps({"leads": leads}).encode()
+
+def before(body: bytes) -> list[dict]:
+    request = EmailStrSyncRequest.model_validate(json.loads(body))
+    return [lead.model_dump(mode="json", exclude_none=True) for lead in request.leads]
+
+def after(body: bytes) -> list[dict]:
+    return SYNC_LEADS.dump_python(SYNC_REQUEST.validate_json(body).leads, mode="json", exclude_none=True)
+
+def best_of(rounds: int, fn, body: bytes, cold: bool = False) -> float:
+    timings = []
+    for _ in range(rounds):
+        if cold:
+            normalize_email_address.cache_clear()
+        started = time.perf_counter()
+        fn(body)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leads", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    body = make_body(args.leads, random.Random(42))
+    assert before(body) == after(body), "validated rows differ"
+    print(f"✅ {args.leads} leads validate to the same rows")
+
+    old = best_of(args.rounds, before, body)
+    cold = best_of(args.rounds, after, body, cold=True)
+    warm = best_of(args.rounds, after, body)
+    print(f"EmailStr model + per-lead model_dump: {old * 1e3:7.2f}ms ({old / args.leads * 1e6:.1f}µs/lead)")
+    print(f"TypeAdapter, cold email cache:        {cold * 1e3:7.2f}ms ({cold / args.leads * 1e6:.1f}µs/lead, {old / cold:.1f}x faster)")
+    print(f"TypeAdapter, warm email cache:        {warm * 1e3:7.2f}ms ({warm / args.leads * 1e6:.1f}µs/lead, {old / warm:.1f}x faster)")
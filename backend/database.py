@@ -1,4 +1,5 @@
 import os
+import httpx
 from dotenv import load_dotenv
 from supabase import create_client, Client, ClientOptions
 
@@ -14,3 +15,45 @@ if url and key:
     supabase = create_client(url, key, options=ClientOptions(postgrest_client_timeout=20))
 else:
     print("Warning: Supabase credentials not found in environment variables.")
+
+# Shared client for the raw PostgREST calls in main.py and utils.py. One
+# instance per process keeps TCP/TLS connections alive between requests.
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.environ.get("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP2 = os.environ.get("HTTP2", "true").lower() != "false"
+
+http_client: httpx.AsyncClient = None
+
+def init_http_client() -> httpx.AsyncClient:
+    global http_client
+    if http_client is None or http_client.is_closed:
+        http2 = HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                print("Warning: h2 is not installed, falling back to HTTP/1.1.")
+                http2 = False
+        http_client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+        )
+    return http_client
+
+def get_http_client() -> httpx.AsyncClient:
+    """Returns the app-lifetime client, creating it for scripts that run outside the API."""
+    return http_client if http_client is not None and not http_client.is_closed else init_http_client()
+
+async def close_http_client():
+    global http_client
+    if http_client is not None:
+        await http_client.aclose()
+        http_client = None
@@ -0,0 +1,209 @@
+"""
+In-memory duplicate detection index for incoming leads.
+
+Every known lead is indexed under its normalized phone (last 10 digits),
+its normalized email and two blocking keys for its name: the Soundex codes
+and the 3-letter prefixes of its first and last name tokens, order-free.
+match() only scores the few leads sharing a key with the incoming one, with
+rapidfuzz, instead of comparing against every row.
+
+An exact email hit is left to the leads_email_unique constraint, which
+rejects the insert if the lead still exists. A hit on the normalized phone
+or email, or a name scoring at least DEDUP_NAME_THRESHOLD (and not
+contradicted by a different company), is only a possible duplicate, for a
+person to review; shared office numbers and family phones make those
+unsafe to drop.
+
+Like lead_aggregates, each API process keeps its own copy. It is filled by
+the periodic full scan and updated as /sync inserts leads.
+"""
+import os
+import re
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+
+from rapidfuzz import fuzz, process
+
+from rebuild import RebuildableIndex
+from utils import normalize_phone
+
+DEDUP_ENABLED = os.environ.get("DEDUP_ENABLED", "true").lower() != "false"
+DEDUP_NAME_THRESHOLD = float(os.environ.get("DEDUP_NAME_THRESHOLD", "90"))
+DEDUP_COMPANY_THRESHOLD = float(os.environ.get("DEDUP_COMPANY_THRESHOLD", "80"))
+# Keys are normalized several times per synced lead (match, batch check, add).
+DEDUP_KEY_CACHE_SIZE = int(os.environ.get("DEDUP_KEY_CACHE_SIZE", "65536"))
+
+# Providers that deliver local+tag@ to local@, so the tag can be ignored.
+SUBADDRESS_DOMAINS = {
+    "gmail.com", "googlemail.com", "outlook.com", "hotmail.com", "live.com",
+    "icloud.com", "me.com", "protonmail.com", "proton.me", "fastmail.com"
+}
+HONORIFICS = {"mr", "mrs", "ms", "miss", "dr", "shri", "smt", "sri", "prof", "ca"}
+SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"), **dict.fromkeys("cgjkqsxz", "2"), **dict.fromkeys("dt", "3"),
+    "l": "4", **dict.fromkeys("mn", "5"), "r": "6"
+}
+
+@lru_cache(maxsize=DEDUP_KEY_CACHE_SIZE)
+def normalize_name(name: str | None) -> str:
+    """Lowercase ASCII tokens without punctuation or honorifics."""
+    if not name:
+        return ""
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode().lower()
+    tokens = [token for token in re.split(r"[^a-z0-9]+", text) if token and token not in HONORIFICS]
+    return " ".join(tokens)
+
+@lru_cache(maxsize=DEDUP_KEY_CACHE_SIZE)
+def normalize_email(email: str | None) -> str:
+    """Lowercased address, with any +tag dropped for providers that ignore it."""
+    if not email or "@" not in email:
+        return ""
+    local, _, domain = email.strip().lower().rpartition("@")
+    if domain in SUBADDRESS_DOMAINS:
+        local = local.split("+", 1)[0]
+    return f"{local}@{domain}"
+
+@lru_cache(maxsize=DEDUP_KEY_CACHE_SIZE)
+def phone_key(phone: str | None) -> str:
+    """The last 10 digits, so +91 / 0 prefixes and formatting do not matter."""
+    digits = normalize_phone(phone or "")
+    return digits[-10:] if len(digits) >= 7 else ""
+
+def soundex(token: str) -> str:
+    if not token:
+        return ""
+    code = token[0]
+    previous = SOUNDEX_CODES.get(token[0], "")
+    for char in token[1:]:
+        digit = SOUNDEX_CODES.get(char, "")
+        if digit and digit != previous:
+            code += digit
+        if char not in "hw":
+            previous = digit
+    return (code + "000")[:4]
+
+def name_blocks(normalized: str) -> set[str]:
+    tokens = normalized.split()
+    if not tokens:
+        return set()
+    ends = sorted({tokens[0], tokens[-1]})
+    return {
+        "s:" + "|".join(sorted(soundex(token) for token in ends)),
+        "p:" + "|".join(token[:3] for token in ends)
+    }
+
+class DedupIndex(RebuildableIndex):
+    def __init__(self):
+        self._leads: dict[str, tuple[str, str, str, str]] = {}
+        self._exact_email: dict[str, str] = {}
+        self._by_exact_email: defaultdict[str, set] = defaultdict(set)
+        self._by_phone: defaultdict[str, set] = defaultdict(set)
+        self._by_email: defaultdict[str, set] = defaultdict(set)
+        self._by_block: defaultdict[str, set] = defaultdict(set)
+        self.stats_counters = {"lookups": 0, "duplicates": 0, "possible_duplicates": 0}
+
+    def __len__(self):
+        return len(self._leads)
+
+    @staticmethod
+    def _keys(lead: dict) -> tuple[str, str, str, str]:
+        return (
+            normalize_name(lead.get("name")),
+            phone_key(lead.get("phone")),
+            normalize_email(lead.get("email")),
+            normalize_name(lead.get("company"))
+        )
+
+    def add(self, lead: dict):
+        """Indexes a lead row (id, name, email, phone, company), replacing any earlier entry."""
+        if not lead.get("id"):
+            return
+        self._log_write(lead)
+        lead_id = str(lead["id"])
+        self.remove(lead_id)
+        name, phone, email, company = keys = self._keys(lead)
+        self._leads[lead_id] = keys
+        if exact_email := (lead.get("email") or "").strip():
+            self._exact_email[lead_id] = exact_email
+            self._by_exact_email[exact_email].add(lead_id)
+        if phone:
+            self._by_phone[phone].add(lead_id)
+        if email:
+            self._by_email[email].add(lead_id)
+        for block in name_blocks(name):
+            self._by_block[block].add(lead_id)
+
+    def remove(self, lead_id: str):
+        keys = self._leads.pop(str(lead_id), None)
+        if keys is None:
+            return
+        name, phone, email, _ = keys
+        exact_email = self._exact_email.pop(str(lead_id), "")
+        for bucket, key in [(self._by_exact_email, exact_email), (self._by_phone, phone), (self._by_email, email)] + [(self._by_block, block) for block in name_blocks(name)]:
+            if key and key in bucket:
+                bucket[key].discard(str(lead_id))
+                if not bucket[key]:
+                    del bucket[key]
+
+    def match(self, lead: dict) -> dict | None:
+        """
+        Returns {"id", "reason", "score"} for the best existing match of lead,
+        or None. reason is "exact_email" for definite duplicates and "phone",
+        "email" or "name" for possible ones.
+        """
+        self.stats_counters["lookups"] += 1
+        own_id = {str(lead["id"])} if lead.get("id") else set()
+        exact_email = (lead.get("email") or "").strip()
+        others = self._by_exact_email.get(exact_email, set()) - own_id if exact_email else set()
+        if others:
+            self.stats_counters["duplicates"] += 1
+            return {"id": next(iter(others)), "reason": "exact_email", "score": 100.0}
+
+        name, phone, email, company = self._keys(lead)
+        for reason, key, bucket in [("phone", phone, self._by_phone), ("email", email, self._by_email)]:
+            others = bucket.get(key, set()) - own_id if key else set()
+            if others:
+                self.stats_counters["possible_duplicates"] += 1
+                return {"id": next(iter(others)), "reason": reason, "score": 100.0}
+
+        candidates = set()
+        for block in name_blocks(name):
+            candidates |= self._by_block.get(block, set())
+        candidates -= own_id
+        if not candidates:
+            return None
+        choices = {}
+        for lead_id in candidates:
+            other_name, _, _, other_company = self._leads[lead_id]
+            # Same name at a different company is most likely someone else.
+            if company and other_company and fuzz.token_set_ratio(company, other_company) < DEDUP_COMPANY_THRESHOLD:
+                continue
+            choices[lead_id] = other_name
+        best = process.extractOne(name, choices, scorer=fuzz.token_sort_ratio, score_cutoff=DEDUP_NAME_THRESHOLD)
+        if best is None:
+            return None
+        self.stats_counters["possible_duplicates"] += 1
+        return {"id": best[2], "reason": "name", "score": round(best[1], 1)}
+
+    def _adopt(self, fresh: "DedupIndex"):
+        self._leads = fresh._leads
+        self._exact_email = fresh._exact_email
+        self._by_exact_email = fresh._by_exact_email
+        self._by_phone = fresh._by_phone
+        self._by_email = fresh._by_email
+        self._by_block = fresh._by_block
+
+    def _replay(self, lead: dict):
+        self.add(lead)
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "leads": len(self._leads),
+            "name_blocks": len(self._by_block),
+            **self.stats_counters,
+            "reconciled_at": self.reconciled_at
+        }
+
+dedup_index = DedupIndex()
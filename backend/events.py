@@ -0,0 +1,55 @@
+"""
+In-process broadcast hub for lead change events.
+
+Write paths publish small events such as
+{"type": "lead", "id": ..., "changes": {...}}; every subscriber (one per
+connected /pipeline/stream client) has its own bounded queue. publish()
+never blocks: a subscriber whose queue is full has its backlog dropped and
+gets a single {"type": "resync"} instead, telling it to reload a snapshot,
+so one slow dashboard cannot hold up writes or grow memory without bound.
+"""
+import asyncio
+import os
+
+EVENTS_QUEUE_SIZE = int(os.environ.get("EVENTS_QUEUE_SIZE", "1000"))
+
+RESYNC = {"type": "resync"}
+
+class BroadcastHub:
+    def __init__(self, maxsize: int = EVENTS_QUEUE_SIZE):
+        self.maxsize = maxsize
+        self._subscribers: set[asyncio.Queue] = set()
+        self.published = 0
+        self.resyncs = 0
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.maxsize)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def publish(self, event: dict):
+        self.published += 1
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+                self.resyncs += 1
+
+    def publish_lead(self, lead_id, changes: dict):
+        self.publish({"type": "lead", "id": str(lead_id), "changes": changes})
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "resyncs": self.resyncs,
+            "queue_size": self.maxsize
+        }
+
+hub = BroadcastHub()
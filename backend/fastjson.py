@@ -0,0 +1,32 @@
+"""
+orjson-backed JSON for API responses and PostgREST bodies.
+
+ORJSONResponse is the app's default response class. The list endpoints
+(/leads, /pipeline, /overdue-leads) return it directly, which also skips
+FastAPI's jsonable_encoder walk over every row; a PostgREST body that
+needs no changes is passed on as raw bytes with raw_json(). json_body()
+parses PostgREST responses from their bytes instead of httpx's
+decode-then-json.loads.
+"""
+from typing import Any
+
+import httpx
+import orjson
+from fastapi.responses import JSONResponse, Response
+
+OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def dumps(data: Any) -> bytes:
+    """Compact UTF-8 JSON; values orjson does not know are rendered with str()."""
+    return orjson.dumps(data, default=str, option=OPTIONS)
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def raw_json(body: bytes, **kwargs) -> Response:
+    """A response carrying already-encoded JSON as it is."""
+    return Response(content=body, media_type="application/json", **kwargs)
+
+def json_body(response: httpx.Response) -> Any:
+    return orjson.loads(response.content)
@@ -0,0 +1,254 @@
+"""
+Financial intent extraction from call transcripts.
+
+A compiled keyword/regex extractor runs first and answers in microseconds;
+Groq is only asked when its confidence is below INTENT_LOCAL_CONFIDENCE
+(or never, without GROQ_API_KEY).
+
+Calls go through the async Groq client, so the event loop keeps serving
+requests during the LLM round trip, and at most INTENT_MAX_CONCURRENCY
+calls are in flight per process. Results are cached by normalized
+transcript, identical transcripts that arrive together share one call, and
+with INTENT_BATCH_WINDOW_MS > 0 transcripts arriving within that window are
+sent to the model together (up to INTENT_BATCH_MAX per call).
+"""
+import asyncio
+import json
+import os
+import re
+
+from groq import AsyncGroq
+
+from cache import TTLCache
+
+GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
+groq_client = AsyncGroq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
+
+INTENT_MODEL = os.environ.get("INTENT_MODEL", "llama3-8b-8192")
+INTENT_MAX_CONCURRENCY = int(os.environ.get("INTENT_MAX_CONCURRENCY", "4"))
+INTENT_CACHE_SIZE = int(os.environ.get("INTENT_CACHE_SIZE", "2048"))
+INTENT_CACHE_TTL = float(os.environ.get("INTENT_CACHE_TTL", str(24 * 3600)))
+INTENT_BATCH_WINDOW_MS = float(os.environ.get("INTENT_BATCH_WINDOW_MS", "0"))
+INTENT_BATCH_MAX = int(os.environ.get("INTENT_BATCH_MAX", "8"))
+INTENT_LOCAL_CONFIDENCE = float(os.environ.get("INTENT_LOCAL_CONFIDENCE", "0.6"))
+
+INTENT_FIELDS = """- investment_type (e.g., PMS, Mutual Fund, Equity)
+- ticket_size (e.g., 50 Lakhs, 1 Crore)
+- urgency (High, Medium, Low)
+- investor_type (HNI, Retail, Institutional)
+- risk_profile (Aggressive, Conservative, Balanced)"""
+
+intent_cache = TTLCache(maxsize=INTENT_CACHE_SIZE, ttl=INTENT_CACHE_TTL)
+extraction_stats = {"local": 0, "llm": 0}
+
+# (label, pattern) per field; the earliest match in the transcript wins.
+_KEYWORDS = {
+    "investment_type": [
+        ("PMS", r"\bpms\b|portfolio management"),
+        ("AIF", r"\baifs?\b|alternative investment"),
+        ("Mutual Fund", r"mutual funds?|\bmfs?\b|\bsips?\b"),
+        ("Equity", r"\bequit(?:y|ies)\b|\bstocks?\b|\bshares\b"),
+        ("Bonds", r"\bbonds?\b|\bdebentures?\b"),
+        ("Fixed Deposit", r"fixed deposits?|\bfds?\b"),
+        ("Insurance", r"\binsurance\b|\bulips?\b"),
+        ("Real Estate", r"real estate|\bproperty\b"),
+    ],
+    "urgency": [
+        ("High", r"\burgent(?:ly)?\b|\bimmediate(?:ly)?\b|\basap\b|right away|\btoday\b|this week"),
+        ("Medium", r"next month|\bsoon\b|this quarter|coming weeks?"),
+        ("Low", r"no hurry|not urgent|\blater\b|next year|just exploring|no rush"),
+    ],
+    "investor_type": [
+        ("HNI", r"\bu?hnis?\b|high net ?worth"),
+        ("Institutional", r"\binstitution(?:al)?\b|family office|\bcorporate\b|\btreasury\b"),
+        ("Retail", r"\bretail\b|\bsalaried\b|first[- ]time investor|small investor"),
+    ],
+    "risk_profile": [
+        ("Aggressive", r"\baggressive\b|high risk|high returns?"),
+        ("Conservative", r"\bconservative\b|low risk|\bsafe\b|capital protection"),
+        ("Balanced", r"\bbalanced\b|\bmoderate\b|medium risk"),
+    ],
+}
+# All rules compiled into one alternation so a transcript is scanned once;
+# the named group that matched maps back to its (field, label).
+_RULE_LABELS = {}
+_alternatives = []
+for _field, _rules in _KEYWORDS.items():
+    for _label, _pattern in _rules:
+        _group = f"r{len(_RULE_LABELS)}"
+        _RULE_LABELS[_group] = (_field, _label)
+        _alternatives.append(f"(?P<{_group}>{_pattern})")
+_KEYWORD_RE = re.compile("|".join(_alternatives), re.IGNORECASE)
+_TICKET_SIZE_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(crores?|cr|lakhs?|lacs?|l)\b", re.IGNORECASE)
+
+# How much each field contributes to the local extractor's confidence; the
+# four fields calculate_priority_score uses dominate.
+_FIELD_WEIGHTS = {
+    "investment_type": 0.25,
+    "ticket_size": 0.25,
+    "urgency": 0.2,
+    "investor_type": 0.2,
+    "risk_profile": 0.1,
+}
+
+def extract_intent_local(transcript: str) -> tuple[dict, float]:
+    """
+    Keyword/regex extraction of the same fields the LLM returns. Returns
+    (data, confidence); confidence is the weighted share of fields found,
+    with fields that matched conflicting labels counted at half weight.
+    """
+    data = {}
+    labels = {}
+    for found in _KEYWORD_RE.finditer(transcript):
+        field, label = _RULE_LABELS[found.lastgroup]
+        data.setdefault(field, label)
+        labels.setdefault(field, set()).add(label)
+
+    confidence = 0.0
+    for field, seen in labels.items():
+        confidence += _FIELD_WEIGHTS[field] * (1 if len(seen) == 1 else 0.5)
+
+    ticket = _TICKET_SIZE_RE.search(transcript)
+    if ticket:
+        value = float(ticket.group(1))
+        amount = f"{value:g}"
+        if ticket.group(2).lower().startswith("c"):
+            data["ticket_size"] = f"{amount} Crore" + ("s" if value > 1 else "")
+        else:
+            data["ticket_size"] = f"{amount} Lakh" + ("s" if value > 1 else "")
+        confidence += _FIELD_WEIGHTS["ticket_size"]
+    return data, round(confidence, 3)
+
+_semaphore: asyncio.Semaphore = None
+_inflight: dict[str, asyncio.Future] = {}
+_batch: list[tuple[str, asyncio.Future]] = []
+_batch_timer: asyncio.TimerHandle = None
+_tasks: set[asyncio.Task] = set()
+
+class ExtractionCancelled(Exception):
+    """Set on a shared call whose owner was cancelled, so waiters retry it."""
+    pass
+
+def normalize_transcript(transcript: str) -> str:
+    return " ".join(transcript.lower().split())
+
+async def _complete(prompt: str) -> dict:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(INTENT_MAX_CONCURRENCY)
+    async with _semaphore:
+        response = await groq_client.chat.completions.create(
+            messages=[{"role": "user", "content": prompt}],
+            model=INTENT_MODEL,
+            temperature=0,
+            response_format={"type": "json_object"}
+        )
+    return json.loads(response.choices[0].message.content)
+
+async def _extract_one(transcript: str) -> dict:
+    print(f"🤖 [AI extraction] Processing transcript: {transcript[:50]}...")
+    prompt = f"""Extract financial intent from this transcript:
+{INTENT_FIELDS}
+
+Return a JSON object only. No preamble.
+Transcript: {transcript}"""
+    return await _complete(prompt)
+
+async def _extract_many(transcripts: list[str]) -> list[dict]:
+    print(f"🤖 [AI extraction] Processing batch of {len(transcripts)} transcripts...")
+    numbered = "\n".join(f"{i + 1}. {json.dumps(t)}" for i, t in enumerate(transcripts))
+    prompt = f"""Extract financial intent from each of these {len(transcripts)} transcripts:
+{INTENT_FIELDS}
+
+Return a JSON object only, no preamble, shaped as {{"results": [...]}} with exactly
+one object per transcript, in the same order.
+Transcripts:
+{numbered}"""
+    results = (await _complete(prompt)).get("results")
+    if not isinstance(results, list) or len(results) != len(transcripts):
+        # The model lost track of the batch; fall back to one call each.
+        return await asyncio.gather(*(_extract_one(t) for t in transcripts))
+    return [result if isinstance(result, dict) else {} for result in results]
+
+async def _run_batch(items: list[tuple[str, asyncio.Future]]):
+    transcripts = [transcript for transcript, _ in items]
+    try:
+        if len(items) == 1:
+            results = [await _extract_one(transcripts[0])]
+        else:
+            results = await _extract_many(transcripts)
+    except Exception as e:
+        for _, future in items:
+            if not future.done():
+                future.set_exception(e)
+        return
+    for (_, future), result in zip(items, results):
+        if not future.done():
+            future.set_result(result)
+
+def _flush_batch():
+    global _batch, _batch_timer
+    if _batch_timer is not None:
+        _batch_timer.cancel()
+        _batch_timer = None
+    items, _batch = _batch, []
+    if items:
+        task = asyncio.create_task(_run_batch(items))
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+
+def _submit_batched(transcript: str) -> asyncio.Future:
+    global _batch_timer
+    future = asyncio.get_running_loop().create_future()
+    _batch.append((transcript, future))
+    if len(_batch) >= INTENT_BATCH_MAX:
+        _flush_batch()
+    elif _batch_timer is None:
+        _batch_timer = asyncio.get_running_loop().call_later(INTENT_BATCH_WINDOW_MS / 1000, _flush_batch)
+    return future
+
+async def extract_intent(transcript: str) -> dict:
+    if not transcript.strip():
+        return {}
+
+    local, confidence = extract_intent_local(transcript)
+    if not groq_client or confidence >= INTENT_LOCAL_CONFIDENCE:
+        extraction_stats["local"] += 1
+        return local
+    extraction_stats["llm"] += 1
+    # The LLM's answer wins; local matches fill whatever it left out.
+    return {**local, **await _extract_intent_llm(transcript)}
+
+async def _extract_intent_llm(transcript: str) -> dict:
+    key = normalize_transcript(transcript)
+    cached = intent_cache.get(key)
+    if cached is not None:
+        return dict(cached)
+    if key in _inflight:
+        try:
+            return dict(await asyncio.shield(_inflight[key]))
+        except ExtractionCancelled:
+            return await _extract_intent_llm(transcript)
+
+    shared = asyncio.get_running_loop().create_future()
+    _inflight[key] = shared
+    try:
+        if INTENT_BATCH_WINDOW_MS > 0:
+            data = await _submit_batched(transcript)
+        else:
+            data = await _extract_one(transcript)
+        print(f"   ✅ Extracted: {data}")
+        if data:
+            intent_cache.set(key, data)
+    except asyncio.CancelledError:
+        # Waiters share this future; resolve it so they don't hang.
+        shared.set_exception(ExtractionCancelled())
+        shared.exception()
+        raise
+    except Exception as e:
+        print(f"❌ Extraction failed: {e}")
+        data = {}
+    finally:
+        _inflight.pop(key, None)
+    shared.set_result(data)
+    return dict(data)
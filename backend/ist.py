@@ -0,0 +1,37 @@
+"""
+UTC to IST rendering for lead timestamps.
+
+India has used a fixed +05:30 offset without DST since 1945, so times are
+shifted with a fixed-offset tzinfo instead of a zoneinfo lookup and
+rendered by slicing isoformat() instead of strftime, keeping every step in
+C. Converted values are memoized, since lists repeat the same
+captured_at / created_at a lot.
+"""
+import os
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+IST_CACHE_SIZE = int(os.environ.get("IST_CACHE_SIZE", "65536"))
+IST = timezone(timedelta(hours=5, minutes=30), "IST")
+IST_FIELDS = ("captured_at", "created_at")
+
+@lru_cache(maxsize=IST_CACHE_SIZE)
+def to_ist(utc_str: str) -> str:
+    """Converts a UTC ISO string to an IST string."""
+    if not utc_str: return utc_str
+    try:
+        return datetime.fromisoformat(utc_str.replace("Z", "+00:00")).astimezone(IST).isoformat(" ", "seconds")[:19] + " IST"
+    except Exception:
+        return utc_str
+
+def convert_times(rows: list[dict], fields: tuple[str, ...] = IST_FIELDS) -> list[dict]:
+    """Rewrites fields of every row to IST in place, converting each distinct value once."""
+    converted = {}
+    for row in rows:
+        for field in fields:
+            if field in row:
+                value = row[field]
+                if value not in converted:
+                    converted[value] = to_ist(value)
+                row[field] = converted[value]
+    return rows
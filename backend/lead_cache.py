@@ -0,0 +1,204 @@
+"""
+Read-through cache of lead rows for this API process.
+
+Single leads are kept in an LRU of LEAD_CACHE_SIZE rows; a full-table
+snapshot, loaded by the first list read, serves /pipeline and
+/overdue-leads. Both expire after LEAD_CACHE_TTL seconds.
+
+Every write path in main.py and utils.py passes the rows it wrote (or the
+columns it changed) to lead_cache.put() / lead_cache.apply(), so this
+process never reads its own writes stale. Writes made by other processes
+or directly in the database show up once the entries expire; the staleness
+counters in stats() report how old the served rows were.
+
+Rows are handed out as copies, since readers rewrite fields in place. The
+snapshot's (created_at, id) keys are kept sorted as it changes, so a /leads
+page is a bisect to the cursor plus copies of the rows on that page.
+"""
+import os
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Callable
+
+LEAD_CACHE_SIZE = int(os.environ.get("LEAD_CACHE_SIZE", "5000"))
+LEAD_CACHE_TTL = float(os.environ.get("LEAD_CACHE_TTL", "30"))
+
+def _copy(row: dict) -> dict:
+    copied = dict(row)
+    if isinstance(copied.get("meta_data"), dict):
+        copied["meta_data"] = dict(copied["meta_data"])
+    return copied
+
+def _sort_key(row: dict) -> tuple[str, str]:
+    return str(row.get("created_at")), str(row.get("id"))
+
+class LeadCache:
+    def __init__(self, maxsize: int = LEAD_CACHE_SIZE, ttl: float = LEAD_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._rows: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._snapshot: dict[str, dict] | None = None
+        # Sort keys of the snapshot's rows, oldest first.
+        self._order: list[tuple[str, str]] = []
+        self._snapshot_at: float = 0.0
+        self.counters = {"hits": 0, "misses": 0, "list_hits": 0, "list_misses": 0, "writes": 0, "invalidations": 0}
+        self._served_age_total = 0.0
+        self._served = 0
+        self._served_age_max = 0.0
+
+    def _served_age(self, loaded_at: float):
+        age = time.monotonic() - loaded_at
+        self._served += 1
+        self._served_age_total += age
+        self._served_age_max = max(self._served_age_max, age)
+
+    def _store(self, lead_id: str, row: dict):
+        """Puts row into the snapshot, moving its sort key if created_at changed."""
+        previous = self._snapshot.get(lead_id)
+        if previous is not None and _sort_key(previous) != _sort_key(row):
+            self._unplace(previous)
+            previous = None
+        self._snapshot[lead_id] = row
+        if previous is None:
+            insort(self._order, _sort_key(row))
+
+    def _unplace(self, row: dict):
+        key = _sort_key(row)
+        position = bisect_left(self._order, key)
+        if position < len(self._order) and self._order[position] == key:
+            del self._order[position]
+
+    def _snapshot_fresh(self) -> bool:
+        return self._snapshot is not None and time.monotonic() - self._snapshot_at < self.ttl
+
+    def _lookup(self, lead_id: str) -> tuple[float, dict] | None:
+        """(loaded_at, row) of a fresh cached copy of the lead, without copying or counting it."""
+        entry = self._rows.get(lead_id)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            return entry
+        if self._snapshot_fresh() and lead_id in self._snapshot:
+            return self._snapshot_at, self._snapshot[lead_id]
+        return None
+
+    def get(self, lead_id: str) -> dict | None:
+        lead_id = str(lead_id)
+        found = self._lookup(lead_id)
+        if found is None:
+            self._rows.pop(lead_id, None)
+            self.counters["misses"] += 1
+            return None
+        if lead_id in self._rows:
+            self._rows.move_to_end(lead_id)
+        self.counters["hits"] += 1
+        self._served_age(found[0])
+        return _copy(found[1])
+
+    def peek(self, lead_id: str) -> dict | None:
+        """Like get(), but left out of the hit and served-age stats and the LRU order."""
+        found = self._lookup(str(lead_id))
+        return _copy(found[1]) if found is not None else None
+
+    def all(self) -> list[dict] | None:
+        """Every lead, newest first, or None when there is no fresh snapshot."""
+        if not self._snapshot_fresh():
+            self.counters["list_misses"] += 1
+            return None
+        self.counters["list_hits"] += 1
+        self._served_age(self._snapshot_at)
+        return [_copy(self._snapshot[key[1]]) for key in reversed(self._order)]
+
+    def page(self, limit: int, after: tuple[str, str] | None = None,
+             match: Callable[[dict], bool] | None = None) -> list[dict] | None:
+        """
+        Up to limit leads newest first, older than the (created_at, id) key
+        after and passing match, or None when there is no fresh snapshot.
+        Only the returned rows are copied.
+        """
+        if not self._snapshot_fresh():
+            self.counters["list_misses"] += 1
+            return None
+        self.counters["list_hits"] += 1
+        self._served_age(self._snapshot_at)
+        end = bisect_left(self._order, after) if after else len(self._order)
+        rows = []
+        for position in range(end - 1, -1, -1):
+            if len(rows) >= limit:
+                break
+            row = self._snapshot[self._order[position][1]]
+            if match is None or match(row):
+                rows.append(_copy(row))
+        return rows
+
+    def load_all(self, rows: list[dict]):
+        """Stores a full-table read as the snapshot."""
+        self._snapshot = {str(row["id"]): _copy(row) for row in rows if row.get("id")}
+        self._order = sorted(_sort_key(row) for row in self._snapshot.values())
+        self._snapshot_at = time.monotonic()
+
+    def put(self, row: dict):
+        """Stores a complete lead row read from or written to the database."""
+        if not row.get("id"):
+            return
+        lead_id = str(row["id"])
+        self._rows[lead_id] = (time.monotonic(), _copy(row))
+        self._rows.move_to_end(lead_id)
+        while len(self._rows) > self.maxsize:
+            self._rows.popitem(last=False)
+        if self._snapshot is not None:
+            self._store(lead_id, _copy(row))
+
+    def apply(self, changes: dict):
+        """
+        Merges a partial write such as {"id": ..., "status": ...} into the
+        cached copies. A lead the snapshot does not know about drops the
+        snapshot, since the rest of its row is unknown.
+        """
+        if not changes.get("id"):
+            return
+        lead_id = str(changes["id"])
+        self.counters["writes"] += 1
+        entry = self._rows.get(lead_id)
+        if entry is not None:
+            self._rows[lead_id] = (entry[0], {**entry[1], **_copy(changes)})
+        if self._snapshot is not None:
+            if lead_id in self._snapshot:
+                self._store(lead_id, {**self._snapshot[lead_id], **_copy(changes)})
+            else:
+                self.invalidate_all()
+
+    def invalidate(self, lead_id: str):
+        """
+        Forgets a lead whose current row is unknown. A snapshot holding it
+        is dropped as well, since removing the lead alone would hide it
+        from lists until the snapshot expired.
+        """
+        self.counters["invalidations"] += 1
+        lead_id = str(lead_id)
+        self._rows.pop(lead_id, None)
+        if self._snapshot is not None and lead_id in self._snapshot:
+            self._snapshot = None
+            self._order = []
+
+    def invalidate_all(self):
+        self.counters["invalidations"] += 1
+        self._snapshot = None
+        self._order = []
+
+    def stats(self) -> dict:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        list_lookups = self.counters["list_hits"] + self.counters["list_misses"]
+        return {
+            **self.counters,
+            "hit_ratio": round(self.counters["hits"] / lookups, 3) if lookups else 0.0,
+            "list_hit_ratio": round(self.counters["list_hits"] / list_lookups, 3) if list_lookups else 0.0,
+            "entries": len(self._rows),
+            "max_entries": self.maxsize,
+            "snapshot_leads": len(self._snapshot) if self._snapshot is not None else None,
+            "snapshot_age_seconds": round(time.monotonic() - self._snapshot_at, 1) if self._snapshot is not None else None,
+            "avg_served_age_seconds": round(self._served_age_total / self._served, 2) if self._served else 0.0,
+            "max_served_age_seconds": round(self._served_age_max, 2),
+            "ttl_seconds": self.ttl
+        }
+
+lead_cache = LeadCache()
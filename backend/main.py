@@ -1,18 +1,37 @@
-from fastapi import FastAPI, BackgroundTasks, File, UploadFile, Form, Header, HTTPException, Depends
+from fastapi import FastAPI, File, UploadFile, Form, Header, HTTPException, Depends, Response, Request, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.concurrency import run_in_threadpool
-import whisper
+from starlette.datastructures import Headers
 import json
-import re
-from groq import Groq
+import base64
+import hashlib
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 import os
-import shutil
+import asyncio
 import ssl
+from contextlib import asynccontextmanager
 ssl._create_default_https_context = ssl._create_unverified_context
-from models import SyncRequest
-from database import supabase
-from utils import process_leads_background, calculate_wealth_metrics
+from models import SyncRequest, DeltaSyncRequest, SYNC_REQUEST, SYNC_LEADS, DELTA_LEADS
+from pydantic import ValidationError
+from fastapi.exceptions import RequestValidationError
+from database import supabase, get_http_client, init_http_client, close_http_client
+from transcription import transcribe_recording, shutdown_pool
+import audio_jobs
+import task_queue
+import transcript_cache
+import audio_storage
+from intent import extract_intent, intent_cache, extraction_stats
+from cache import TTLCache, SingleFlight
+from aggregates import LeadAggregates, lead_aggregates, AGGREGATES_RECONCILE_SECONDS
+from dedup import DedupIndex, dedup_index, DEDUP_ENABLED
+from lead_cache import lead_cache
+from events import hub, RESYNC
+from reminders import ReminderIndex, reminder_index
+from ist import to_ist, convert_times
+from fastjson import ORJSONResponse, dumps, raw_json, json_body
+from utils import process_leads_background, generate_meeting_link, insert_leads_bulk, insert_leads_individually, SYNC_CHUNK_SIZE
+from scoring import calculate_priority_score, calculate_wealth_metrics, score_batch, to_columns
 
 
 load_dotenv()
@@ -22,68 +41,61 @@ def get_current_user(x_user_id: str = Header(None)):
         return {"id": "00000000-0000-0000-0000-000000000000"}  # Default mock user
     return {"id": x_user_id}
 
-app = FastAPI(title="Lead Management API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_http_client()
+    audio_gc = asyncio.create_task(audio_storage.run_garbage_collector())
+    reconciler = asyncio.create_task(run_aggregate_reconciler())
+    reminder_scheduler = asyncio.create_task(reminder_index.run_scheduler())
+    task_queue.start()
+    yield
+    reconciler.cancel()
+    reminder_scheduler.cancel()
+    audio_gc.cancel()
+    if rescore_task is not None:
+        rescore_task.cancel()
+    await audio_jobs.shutdown()
+    await task_queue.shutdown()
+    await close_http_client()
+    shutdown_pool()
 
-model = whisper.load_model("base")
-GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
-groq_client = Groq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
+app = FastAPI(title="Lead Management API", version="1.0.0", lifespan=lifespan, default_response_class=ORJSONResponse)
 
-async def extract_intent(transcript: str) -> dict:
-    if not transcript.strip() or not groq_client:
-        return {}
-    
-    try:
-        print(f"🤖 [AI extraction] Processing transcript: {transcript[:50]}...")
-        prompt = f"""Extract financial intent from this transcript:
-- investment_type (e.g., PMS, Mutual Fund, Equity)
-- ticket_size (e.g., 50 Lakhs, 1 Crore)
-- urgency (High, Medium, Low)
-- investor_type (HNI, Retail, Institutional)
-- risk_profile (Aggressive, Conservative, Balanced)
-
-Return a JSON object only. No preamble.
-Transcript: {transcript}"""
-
-        response = groq_client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama3-8b-8192",
-            temperature=0,
-            response_format={"type": "json_object"}
-        )
-        data = json.loads(response.choices[0].message.content)
-        print(f"   ✅ Extracted: {data}")
-        return data
-    except Exception as e:
-        print(f"❌ Extraction failed: {e}")
-        return {}
+class LimitUploadSize:
+    """
+    Refuses oversized recordings before the multipart body is parsed: by
+    Content-Length when it is sent, otherwise by counting the body as it
+    streams in, so chunked uploads stop at the limit instead of being
+    spooled to disk first.
+    """
+    def __init__(self, app, path: str, max_bytes: int):
+        self.app = app
+        self.path = path
+        self.max_bytes = max_bytes
 
-def calculate_priority_score(data: dict) -> int:
-    score = 0
-    print(f"📊 [AI Score] Input Data: {data}")
-    
-    if data.get("urgency") in ["High", "Urgent", "Immediate"]:
-        score += 30
-    
-    ticket_size_raw = str(data.get("ticket_size", "")).lower()
-    # Handle formats: 50l, 50 lakhs, 1cr, 1 crore
-    match = re.search(r"(\d+(?:\.\d+)?)\s*(l|lakh|cr|crore)", ticket_size_raw)
-    if match:
-        val = float(match.group(1))
-        unit = match.group(2)
-        if 'cr' in unit:
-            score += 40 # High value
-        elif val >= 50:
-            score += 25
-    
-    if data.get("investor_type") in ["HNI", "Institutional", "Wealthy"]:
-        score += 20
-    if data.get("investment_type") in ["PMS", "AIF", "Equity"]:
-        score += 15
-        
-    final_score = min(score, 100)
-    print(f"   🎯 Final Score: {final_score}")
-    return final_score
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != self.path:
+            return await self.app(scope, receive, send)
+        detail = f"Upload exceeds {audio_storage.MAX_UPLOAD_BYTES} bytes"
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            return await JSONResponse(status_code=413, content={"detail": detail})(scope, receive, send)
+
+        received = 0
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+        await self.app(scope, limited_receive, send)
 
+# Allow some headroom for the multipart framing and form fields.
+app.add_middleware(LimitUploadSize, path="/process-audio", max_bytes=audio_storage.MAX_UPLOAD_BYTES + 64 * 1024)
+
+SYNC_BULK_INSERT = os.environ.get("SYNC_BULK_INSERT", "true").lower() != "false"
 
 origins = ["*"]  
 
@@ -93,28 +105,17 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Idempotent-Replayed"],
 )
 
-from zoneinfo import ZoneInfo
-from datetime import datetime
-
-def to_ist(utc_str: str) -> str:
-    """Converts a UTC ISO string to an IST string."""
-    if not utc_str: return utc_str
-    try:
-        # Supabase returns strings like 2024-02-14T12:00:00+00:00
-        dt = datetime.fromisoformat(utc_str.replace("Z", "+00:00"))
-        ist_dt = dt.astimezone(ZoneInfo("Asia/Kolkata"))
-        return ist_dt.strftime("%Y-%m-%d %H:%M:%S IST")
-    except:
-        return utc_str
+from datetime import datetime, timezone
 
 @app.get("/")
-def root():
+async def root():
     return {"message": "Lead Management API is running"}
 
 @app.get("/health")
-def health_check():
+async def health_check():
     """
     Health check endpoint for the dashboard to verify DB connection.
     """
@@ -123,112 +124,466 @@ def health_check():
     URL = f"{SUPABASE_URL}/rest/v1/leads?select=id&limit=1"
     headers = {"apikey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"}
     try:
-        with httpx.Client(timeout=10.0) as client:
-            response = client.get(URL, headers=headers)
-            if response.status_code == 200:
-                return {"status": "ok", "db": "connected"}
-            return {"status": "error", "db": "disconnected", "details": response.text}
+        client = get_http_client()
+        response = await client.get(URL, headers=headers, timeout=10.0)
+        if response.status_code == 200:
+            return {"status": "ok", "db": "connected"}
+        return {"status": "error", "db": "disconnected", "details": response.text}
     except Exception as e:
         return {"status": "error", "db": "disconnected", "details": str(e)}
 
-import httpx
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Cache and queue counters for this worker process.
+    """
+    return {
+        "transcript_cache": await run_in_threadpool(transcript_cache.get_stats),
+        "intent_cache": intent_cache.stats(),
+        "intent_extraction": extraction_stats,
+        "stats_cache": stats_cache.stats(),
+        "sync_idempotency_cache": sync_results.stats(),
+        "lead_aggregates": lead_aggregates.stats(),
+        "dedup_index": dedup_index.stats(),
+        "reminder_index": reminder_index.stats(),
+        "lead_cache": lead_cache.stats(),
+        "events": hub.stats(),
+        "task_queue": await run_in_threadpool(task_queue.get_stats)
+    }
 
-@app.post("/sync")
-def sync_leads(request: SyncRequest, background_tasks: BackgroundTasks):
+async def enrich_leads(leads: list[dict]) -> dict[int, str]:
     """
-    Receives a batch of leads and performs a First-Come-First-Served insert.
+    task_queue handler for post-sync enrichment. Only failed leads are
+    retried, and process_leads_background() records finished steps in their
+    payloads so a retry does not log a second Sync interaction.
     """
-    print(f"🚀 [Sync Request] Received {len(request.leads)} leads.")
+    failed = (await process_leads_background(leads))["failed"]
+    return {i: failed[str(lead["id"])] for i, lead in enumerate(leads) if str(lead["id"]) in failed}
+
+task_queue.register("enrich_leads", enrich_leads)
+
+VALID_STATUSES = ['New', 'Contacted', 'Qualified', 'Lost', 'Meeting', 'Won', 'Met', 'Follow-up', 'Engaged', 'Outcome']
+
+def prepare_lead_row(lead_dump: dict) -> dict:
+    """
+    Turns a synced lead, as dumped by SYNC_LEADS / DELTA_LEADS, into a DB
+    row in place: status check, meta_data fields and wealth metrics.
+    """
+    lead_dump.pop("updated_at", None)
+
+    original_status = lead_dump.get("status", "New")
+    if original_status not in VALID_STATUSES:
+        lead_dump["status"] = "New"
     
+    meta = lead_dump.get("meta_data", {})
+    meta["original_status"] = original_status
+    for field in ["location", "intent", "social_media"]:
+        if value := lead_dump.pop(field, None):
+            meta[field] = value
     
-    SUPABASE_URL = os.environ.get("SUPABASE_URL")
-    SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
-    REST_URL = f"{SUPABASE_URL}/rest/v1/leads"
+    # Calculate wealth metrics
+    combined_data = {**lead_dump, **meta}
+    wealth_metrics = calculate_wealth_metrics(combined_data)
+    meta.update(wealth_metrics)
     
+    lead_dump["meta_data"] = meta
+    return lead_dump
+
+def prepare_edit_row(edit: dict, server_row: dict) -> dict:
+    """
+    Turns a client edit of an existing lead, dumped with exclude_unset, into
+    the columns to update in place. Only fields the client sent are written,
+    and meta_data is merged into the server's copy so server-side fields
+    (priority_score, meeting_link, extracted intent) survive the edit.
+    """
+    edit.pop("updated_at", None)
+
+    meta = {**(server_row.get("meta_data") or {}), **(edit.get("meta_data") or {})}
+    if "status" in edit:
+        meta["original_status"] = edit["status"]
+        if edit["status"] not in VALID_STATUSES:
+            edit["status"] = server_row.get("status") or "New"
+    for field in ["location", "intent", "social_media"]:
+        if value := edit.pop(field, None):
+            meta[field] = value
+
+    meta.update(calculate_wealth_metrics({**server_row, **edit, **meta}))
+    edit["meta_data"] = meta
+    return edit
+
+def prepare_new_rows(leads: list[dict]) -> tuple[list[dict], int]:
+    """
+    Prepares dumped leads for insert. Phone, email and name matches are
+    marked with possible_duplicate_of; leads whose exact email is taken are
+    still sent and left to the insert, which ignores them. Returns
+    (rows, skipped).
+    """
+    rows = []
+    skipped = 0
+    # Catches the same person twice within this batch.
+    batch_index = DedupIndex()
+
+    for position, lead in enumerate(leads):
+        try:
+            print(f"📥 [Sync] Processing: {lead.get('name')} (ID: {lead.get('id')})")
+            lead_dump = prepare_lead_row(lead)
+            meta = lead_dump["meta_data"]
+            
+            if DEDUP_ENABLED:
+                duplicate = dedup_index.match(lead_dump) or batch_index.match(lead_dump)
+                # The index is rebuilt only on the reconcile scan and never sees
+                # deletions, so an exact email hit may point at a lead that is
+                # gone. The email constraint decides those instead; leads
+                # without a client id have no row to point at yet.
+                if duplicate and (duplicate["reason"] == "exact_email" or duplicate["id"].startswith("batch-")):
+                    duplicate = None
+                if duplicate:
+                    meta["possible_duplicate_of"] = duplicate["id"]
+                    meta["duplicate_score"] = duplicate["score"]
+                batch_index.add({**lead_dump, "id": lead_dump.get("id") or f"batch-{position}"})
+
+            rows.append(lead_dump)
+                
+        except Exception as e:
+            print(f"Fatal Exception for {lead.get('name')}: {str(e)}")
+            skipped += 1
+    return rows, skipped
+
+def supabase_headers(prefer: str | None = None) -> dict:
+    SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
     headers = {
         "apikey": SUPABASE_KEY,
         "Authorization": f"Bearer {SUPABASE_KEY}",
-        "Content-Type": "application/json",
-        "Prefer": "return=representation"
+        "Content-Type": "application/json"
     }
+    if prefer:
+        headers["Prefer"] = prefer
+    return headers
 
-    new_leads = []
-    skipped = 0
+async def insert_new_rows(rows: list[dict]) -> tuple[list[dict], int]:
+    """
+    Inserts prepared rows and records the saved leads in the in-memory
+    indexes and the enrichment queue. Returns (saved_rows, rejected).
+    """
+    REST_URL = f"{os.environ.get('SUPABASE_URL')}/rest/v1/leads"
+    headers = supabase_headers("return=representation")
 
-    with httpx.Client(timeout=30.0) as client:
-        for lead in request.leads:
-            try:
-                print(f"📥 [Sync] Processing: {lead.name} (ID: {lead.id})")
-                lead_dump = lead.model_dump(mode='json', exclude_none=True)
-                
-      
-                valid_statuses = ['New', 'Contacted', 'Qualified', 'Lost', 'Meeting', 'Won', 'Met', 'Follow-up', 'Engaged', 'Outcome']
-                original_status = lead_dump.get("status", "New")
-                if original_status not in valid_statuses:
-                    lead_dump["status"] = "New"
-                
-                meta = lead_dump.get("meta_data", {})
-                meta["original_status"] = original_status
-                for field in ["location", "intent", "social_media"]:
-                    if value := lead_dump.pop(field, None):
-                        meta[field] = value
-                
-                # Calculate wealth metrics
-                combined_data = {**lead_dump, **meta}
-                wealth_metrics = calculate_wealth_metrics(combined_data)
-                meta.update(wealth_metrics)
-                
-                lead_dump["meta_data"] = meta
-                
-                print(f"   📡 Sending to PostgREST...")
-                response = client.post(REST_URL, headers=headers, json=lead_dump)
-                print(f"   📡 Result: {response.status_code}")
-                
-                if response.status_code in [201, 200]:
-                    data = response.json()
-                    if data:
-                        saved_lead = {"id": data[0]["id"], "name": data[0]["name"]}
-                        new_leads.append(saved_lead)
-                        print(f"Saved Successfully: {lead.name}")
-                    else:
-                        print(f"Success but No Data Returned for {lead.name}")
-                elif response.status_code == 409:
-                    print(f"Duplicate Conflict (409): {lead.name}. Details: {response.text}")
-                    skipped += 1
-                else:
-                    print(f"DB REJECTED ({response.status_code}): {response.text}")
-                    skipped += 1
-                    
-            except Exception as e:
-                print(f"Fatal Exception for {lead.name}: {str(e)}")
-                skipped += 1
+    client = get_http_client()
+    if SYNC_BULK_INSERT:
+        saved_rows, rejected = await insert_leads_bulk(client, REST_URL, headers, rows)
+    else:
+        saved_rows, rejected = await insert_leads_individually(client, REST_URL, headers, rows)
+
+    new_leads = []
+    for saved in saved_rows:
+        lead_aggregates.apply(saved)
+        reminder_index.apply(saved)
+        dedup_index.add(saved)
+        lead_cache.put(saved)
+        hub.publish_lead(saved["id"], saved)
+        new_leads.append({key: saved.get(key) for key in ["id", "name", "email", "phone", "notes"]})
 
     if new_leads:
-        background_tasks.add_task(process_leads_background, new_leads)
+        try:
+            await run_in_threadpool(task_queue.enqueue, "enrich_leads", new_leads)
+        except Exception as e:
+            print(f"⚠️ [Sync] Could not queue enrichment for {len(new_leads)} leads: {e}")
+    return saved_rows, rejected
+
+SYNC_IDEMPOTENCY_CACHE_SIZE = int(os.environ.get("SYNC_IDEMPOTENCY_CACHE_SIZE", "10000"))
+SYNC_IDEMPOTENCY_TTL = float(os.environ.get("SYNC_IDEMPOTENCY_TTL", "86400"))
+# Idempotency-Key -> (payload fingerprint, response)
+sync_results = TTLCache(maxsize=SYNC_IDEMPOTENCY_CACHE_SIZE, ttl=SYNC_IDEMPOTENCY_TTL)
+sync_flight = SingleFlight()
+
+async def run_sync(request: SyncRequest) -> dict:
+    print(f"🚀 [Sync Request] Received {len(request.leads)} leads.")
+
+    rows, skipped = prepare_new_rows(SYNC_LEADS.dump_python(request.leads, mode="json", exclude_none=True))
+    saved_rows, rejected = await insert_new_rows(rows)
+    skipped += rejected
             
     return {
         "status": "success", 
-        "new_records": len(new_leads), 
+        "new_records": len(saved_rows), 
         "ignored_duplicates": skipped
     }
 
-@app.post("/process-audio")
-async def process_audio(lead_id: str = Form(...), file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
-    upload_dir = "uploads"
-    if not os.path.exists(upload_dir):
-        os.makedirs(upload_dir)
-    
-    file_path = os.path.join(upload_dir, f"{lead_id}_{file.filename}")
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    result = await run_in_threadpool(model.transcribe, file_path)
-    transcript = result.get("text", "")
+async def parse_sync_request(http_request: Request) -> SyncRequest:
+    """
+    Validates the raw /sync body with SYNC_REQUEST in one pass, skipping the
+    json.loads FastAPI would run first. Errors keep FastAPI's 422 shape,
+    with ["body", "leads", index, field] locations per invalid lead.
+    """
+    try:
+        return SYNC_REQUEST.validate_json(await http_request.body())
+    except ValidationError as e:
+        raise RequestValidationError([{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)])
+
+@app.post("/sync", openapi_extra={"requestBody": {"required": True, "content": {"application/json": {"schema": SyncRequest.model_json_schema()}}}})
+async def sync_leads(http_request: Request, response: Response, idempotency_key: str | None = Header(None)):
+    """
+    Receives a batch of leads and performs a First-Come-First-Served insert.
+    With an Idempotency-Key header, a retry of the same payload returns the
+    original response (marked Idempotent-Replayed: true) without touching
+    the database, and concurrent duplicates share one run. Reusing a key
+    for a different payload is a 422.
+    """
+    request = await parse_sync_request(http_request)
+    if not idempotency_key:
+        return await run_sync(request)
+
+    fingerprint = hashlib.sha256(request.model_dump_json().encode()).hexdigest()
+    cached = sync_results.get(idempotency_key)
+    if cached is None:
+        async def run_and_store():
+            result = (fingerprint, await run_sync(request))
+            sync_results.set(idempotency_key, result)
+            return result
+        joined = sync_flight.in_flight(idempotency_key)
+        cached = await sync_flight.do(idempotency_key, run_and_store)
+    else:
+        joined = True
+
+    if cached[0] != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different payload")
+    if joined:
+        print(f"🔁 [Sync] Replaying result for Idempotency-Key {idempotency_key}")
+        response.headers["Idempotent-Replayed"] = "true"
+    return cached[1]
+
+DELTA_PAGE_SIZE = int(os.environ.get("DELTA_PAGE_SIZE", "500"))
+DELTA_SETTLE_SECONDS = float(os.environ.get("DELTA_SETTLE_SECONDS", "2"))
+
+def encode_delta_cursor(lead: dict) -> str:
+    """Opaque cursor for the (updated_at, id) position of a raw lead row."""
+    return base64.urlsafe_b64encode(json.dumps([lead["updated_at"], lead["id"]]).encode()).decode()
+
+def decode_delta_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        updated_at, lead_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(updated_at), str(lead_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def parse_timestamp(value) -> datetime | None:
+    if not value:
+        return None
+    dt = value if isinstance(value, datetime) else datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+async def load_device_state(device_id: str) -> dict | None:
+    """The device's row in sync_devices, or None if it has none (or the table is missing)."""
+    res = await get_http_client().get(
+        f"{os.environ.get('SUPABASE_URL')}/rest/v1/sync_devices",
+        headers=supabase_headers(),
+        params={"device_id": f"eq.{device_id}", "select": "*"}
+    )
+    if res.status_code != 200:
+        print(f"⚠️ [Delta Sync] Device state unavailable ({res.status_code}): {res.text}")
+        return None
+    rows = json_body(res)
+    return rows[0] if rows else None
+
+async def save_device_state(state: dict):
+    res = await get_http_client().post(
+        f"{os.environ.get('SUPABASE_URL')}/rest/v1/sync_devices",
+        headers=supabase_headers("resolution=merge-duplicates,return=minimal"),
+        params={"on_conflict": "device_id"},
+        json=state
+    )
+    if res.status_code not in [200, 201, 204]:
+        print(f"⚠️ [Delta Sync] Could not save state of {state['device_id']} ({res.status_code}): {res.text}")
+
+async def fetch_server_rows(lead_ids: list[str]) -> dict[str, dict]:
+    """The server's rows for the given leads that exist, by id."""
+    server_rows = {}
+    client = get_http_client()
+    for start in range(0, len(lead_ids), SYNC_CHUNK_SIZE):
+        chunk = lead_ids[start:start + SYNC_CHUNK_SIZE]
+        res = await client.get(
+            f"{os.environ.get('SUPABASE_URL')}/rest/v1/leads",
+            headers=supabase_headers(),
+            params={"id": f"in.({','.join(chunk)})", "select": "*"}
+        )
+        if res.status_code != 200:
+            raise Exception(res.text)
+        for row in json_body(res):
+            server_rows[str(row["id"])] = row
+    return server_rows
+
+async def upsert_changed_rows(rows: list[dict]) -> list[dict]:
+    """
+    Writes client edits of existing leads with on_conflict=id upserts;
+    returns the saved rows. Rows are grouped by the columns they carry, so
+    an upsert never writes a column default over a field the edit left out.
+    """
+    groups: dict[tuple[str, ...], list[dict]] = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+
+    saved_rows = []
+    client = get_http_client()
+    for columns, group in groups.items():
+        for start in range(0, len(group), SYNC_CHUNK_SIZE):
+            chunk = group[start:start + SYNC_CHUNK_SIZE]
+            res = await client.post(
+                f"{os.environ.get('SUPABASE_URL')}/rest/v1/leads",
+                headers=supabase_headers("resolution=merge-duplicates,return=representation"),
+                params={"on_conflict": "id", "columns": ",".join(columns)},
+                json=chunk
+            )
+            if res.status_code not in [200, 201]:
+                raise Exception(res.text)
+            saved_rows.extend(json_body(res))
+    for saved in saved_rows:
+        lead_aggregates.apply(saved)
+        reminder_index.apply(saved)
+        dedup_index.add(saved)
+        lead_cache.put(saved)
+        hub.publish_lead(saved["id"], saved)
+    return saved_rows
+
+async def fetch_changes(cursor: str | None) -> tuple[list[dict], bool]:
+    """
+    Up to DELTA_PAGE_SIZE leads changed after cursor, oldest change first,
+    and whether more are waiting. Changes younger than DELTA_SETTLE_SECONDS
+    are left for the next sync: updated_at is stamped when a transaction
+    starts, so a slow writer could otherwise commit behind the cursor.
+    """
+    settled = datetime.now(timezone.utc).timestamp() - DELTA_SETTLE_SECONDS
+    params = {
+        "select": "*",
+        "order": "updated_at.asc,id.asc",
+        "updated_at": f"lt.{datetime.fromtimestamp(settled, timezone.utc).isoformat()}",
+        "limit": DELTA_PAGE_SIZE + 1
+    }
+    if cursor:
+        updated_at, lead_id = decode_delta_cursor(cursor)
+        params["or"] = f'(updated_at.gt."{updated_at}",and(updated_at.eq."{updated_at}",id.gt."{lead_id}"))'
+    res = await get_http_client().get(
+        f"{os.environ.get('SUPABASE_URL')}/rest/v1/leads", headers=supabase_headers(), params=params
+    )
+    if res.status_code != 200:
+        raise Exception(res.text)
+    changes = json_body(res)
+    return changes[:DELTA_PAGE_SIZE], len(changes) > DELTA_PAGE_SIZE
+
+@app.post("/sync/delta")
+async def sync_delta(request: DeltaSyncRequest, idempotency_key: str | None = Header(None)):
+    """
+    Two-way incremental sync for one device. The client uploads only the
+    leads it created or edited since its last sync (edits carry the
+    updated_at they were based on) and gets back the leads changed on the
+    server after its cursor, with the next cursor; while has_more is true
+    it should call again. Sending that cursor back acknowledges the page,
+    and only acknowledged cursors are stored for the device: a call without
+    a cursor resumes from the last one sent, so a lost response is sent
+    again instead of skipped. An edit older than the server's copy is not
+    applied and is listed in conflicts; the server's copy comes back in
+    changes. Leads this device inserted in its previous call count as its
+    own writes, not conflicts, when they are sent again. Repeating the last
+    request with the same Idempotency-Key (header or body) returns the
+    stored response without redoing any work.
+    """
+    key = request.idempotency_key or idempotency_key
+    device = await load_device_state(request.device_id) or {}
+    if key and device.get("last_idempotency_key") == key and device.get("last_response"):
+        print(f"🔁 [Delta Sync] Replaying {key} for device {request.device_id}")
+        return device["last_response"]
+
+    cursor = request.cursor or device.get("cursor")
+    own_inserts = set(device.get("inserted_ids") or [])
+    saved_rows, resent = [], []
+    print(f"🚀 [Delta Sync] Device {request.device_id}: {len(request.leads)} local changes.")
+    try:
+        leads = DELTA_LEADS.dump_python(request.leads, mode="json", exclude_none=True)
+        # Edits carry only the fields the client sent, not model defaults.
+        sent = DELTA_LEADS.dump_python(request.leads, mode="json", exclude_unset=True)
+        server_rows = await fetch_server_rows([lead["id"] for lead in leads if lead.get("id")])
+        new_leads, edits, conflicts = [], [], []
+        for lead, edit in zip(leads, sent):
+            lead_id = lead.get("id")
+            if lead_id not in server_rows:
+                new_leads.append(lead)
+                continue
+            server_at = parse_timestamp(server_rows[lead_id].get("updated_at"))
+            client_at = parse_timestamp(lead.get("updated_at"))
+            if client_at is None and lead_id in own_inserts:
+                # Inserted by this device's last call, whose response it never got.
+                resent.append(lead_id)
+            elif server_at and (client_at is None or client_at < server_at):
+                conflicts.append(lead_id)
+                continue
+            edits.append(prepare_edit_row(edit, server_rows[lead_id]))
+
+        rows, skipped = prepare_new_rows(new_leads)
+        saved_rows, rejected = await insert_new_rows(rows)
+        updated_rows = await upsert_changed_rows(edits)
+
+        changes, has_more = await fetch_changes(cursor)
+    except HTTPException:
+        raise
+    except Exception as e:
+        if saved_rows:
+            # Those inserts stand, so a retry must see them as this device's own.
+            await save_device_state({
+                "device_id": request.device_id,
+                "inserted_ids": [row["id"] for row in saved_rows] + resent
+            })
+        return {"error": str(e)}
+
+    response = {
+        "status": "success",
+        "created": len(saved_rows),
+        "updated": len(updated_rows),
+        "ignored_duplicates": skipped + rejected,
+        "conflicts": conflicts,
+        "changes": changes,
+        "cursor": encode_delta_cursor(changes[-1]) if changes else cursor,
+        "has_more": has_more
+    }
+    await save_device_state({
+        "device_id": request.device_id,
+        "cursor": cursor,
+        "inserted_ids": [row["id"] for row in saved_rows] + resent,
+        "last_idempotency_key": key,
+        "last_response": response if key else None,
+        "last_synced_at": datetime.now(timezone.utc).isoformat()
+    })
+    return response
+
+async def run_audio_pipeline(lead_id: str, file_path: str, audio_hash: str, current_user: dict) -> dict:
+    """
+    Transcribes a saved recording, extracts intent, scores it, enriches the
+    lead's meta_data and logs the interaction. Recordings already seen (same
+    audio hash) reuse the cached transcript and intent.
+    """
+    try:
+        return await _run_audio_pipeline(lead_id, file_path, audio_hash, current_user)
+    finally:
+        # Once the transcript is cached the audio itself is no longer needed.
+        transcript_stored = await run_in_threadpool(transcript_cache.contains, audio_hash)
+        audio_storage.release(file_path, transcript_stored)
+
+async def _run_audio_pipeline(lead_id: str, file_path: str, audio_hash: str, current_user: dict) -> dict:
+    cached = await run_in_threadpool(transcript_cache.get, audio_hash)
+    if cached is not None:
+        print(f"♻️ [Transcript Cache] Hit for {audio_hash[:12]}")
+        transcript = cached["transcript"]
+    else:
+        result = await transcribe_recording(file_path)
+        transcript = result.get("text", "")
 
     extracted_data = {}
-    if transcript.strip():
+    if cached is not None and cached["intent"] is not None:
+        extracted_data = cached["intent"]
+    elif transcript.strip():
         extracted_data = await extract_intent(transcript)
 
+    if cached is None or (cached["intent"] is None and extracted_data):
+        await run_in_threadpool(transcript_cache.put, audio_hash, transcript, extracted_data)
+
     priority_score = calculate_priority_score(extracted_data)
 
     SUPABASE_URL = os.environ.get("SUPABASE_URL")
@@ -239,52 +594,66 @@ async def process_audio(lead_id: str = Form(...), file: UploadFile = File(...),
         "Content-Type": "application/json"
     }
 
-    with httpx.Client(timeout=30.0) as client:
-        lead_res = client.get(f"{SUPABASE_URL}/rest/v1/leads?id=eq.{lead_id}", headers=headers)
-        if lead_res.status_code == 200 and lead_res.json():
-            current_lead = lead_res.json()[0]
-            
-            if current_lead.get("owner_id") and current_lead.get("owner_id") != current_user["id"]:
-                raise HTTPException(status_code=403, detail="Not authorized to update this lead")
-            
-            current_meta = current_lead.get("meta_data", {}) or {}
-            
-            updated_meta = {**current_meta}
-            for key, value in extracted_data.items():
-                if key not in updated_meta or not updated_meta[key]:
-                    updated_meta[key] = value
-            
-            if "priority_score" not in updated_meta or not updated_meta["priority_score"]:
-                updated_meta["priority_score"] = priority_score
-            
-            if "is_hot" not in updated_meta:
-                updated_meta["is_hot"] = priority_score >= 50
+    client = get_http_client()
+    current_lead = lead_cache.get(lead_id)
+    if current_lead is None:
+        lead_res = await client.get(f"{SUPABASE_URL}/rest/v1/leads?id=eq.{lead_id}", headers=headers)
+        if lead_res.status_code == 200 and json_body(lead_res):
+            current_lead = json_body(lead_res)[0]
+            lead_cache.put(current_lead)
+    if current_lead is not None:
+        lead_aggregates.apply(current_lead)
+        reminder_index.apply(current_lead)
+        
+        if current_lead.get("owner_id") and current_lead.get("owner_id") != current_user["id"]:
+            raise HTTPException(status_code=403, detail="Not authorized to update this lead")
+        
+        current_meta = current_lead.get("meta_data", {}) or {}
+        
+        updated_meta = {**current_meta}
+        for key, value in extracted_data.items():
+            if key not in updated_meta or not updated_meta[key]:
+                updated_meta[key] = value
+        
+        # Kept on its own so rescoring sees the call's intent, not form fields like ticket_size.
+        updated_meta["extracted_intent"] = extracted_data
 
-            if (priority_score > 75 or current_lead.get("status") == "Meeting") and "meeting_link" not in updated_meta:
-                updated_meta["meeting_link"] = f"https://meet.jit.si/finideas-{lead_id}"
-            
-            client.patch(
-                f"{SUPABASE_URL}/rest/v1/leads?id=eq.{lead_id}",
-                headers=headers,
-                json={"meta_data": updated_meta}
-            )
+        if "priority_score" not in updated_meta or not updated_meta["priority_score"]:
+            updated_meta["priority_score"] = priority_score
+        
+        if "is_hot" not in updated_meta:
+            updated_meta["is_hot"] = priority_score >= 50
+
+        if (priority_score > 75 or current_lead.get("status") == "Meeting") and "meeting_link" not in updated_meta:
+            updated_meta["meeting_link"] = f"https://meet.jit.si/finideas-{lead_id}"
+        
+        patch_res = await client.patch(
+            f"{SUPABASE_URL}/rest/v1/leads?id=eq.{lead_id}",
+            headers=headers,
+            json={"meta_data": updated_meta}
+        )
+        if patch_res.status_code in [200, 204]:
+            lead_cache.apply({"id": lead_id, "meta_data": updated_meta})
+            hub.publish_lead(lead_id, {"meta_data": updated_meta})
+        else:
+            lead_cache.invalidate(lead_id)
 
     interaction = {
         "lead_id": lead_id,
         "type": "Note",
         "summary": f"Audio Transcribed: {transcript[:200]}...",
-        "recording_url": file_path,
-        "meta_data": {"transcript": transcript, "priority_score": priority_score}
+        # The audio is deleted once its transcript is cached, so keep its hash rather than a path.
+        "recording_url": None,
+        "meta_data": {"transcript": transcript, "priority_score": priority_score, "audio_hash": audio_hash}
     }
     
-    with httpx.Client(timeout=30.0) as client:
-        interaction_res = client.post(f"{SUPABASE_URL}/rest/v1/interactions", headers=headers, json=interaction)
-        if interaction_res.status_code not in [200, 201]:
-            print(f"⚠️ [Backend] Interaction log failed: {interaction_res.text}")
-    
+    interaction_res = await client.post(f"{SUPABASE_URL}/rest/v1/interactions", headers=headers, json=interaction)
+    if interaction_res.status_code not in [200, 201]:
+        print(f"⚠️ [Backend] Interaction log failed: {interaction_res.text}")
+
     return {
         "status": "uploaded",
-        "file_path": file_path,
+        "audio_hash": audio_hash,
         "lead_id": lead_id,
         "transcript": transcript,
         "extracted_intent": extracted_data,
@@ -292,42 +661,163 @@ async def process_audio(lead_id: str = Form(...), file: UploadFile = File(...),
         "meeting_link": f"https://meet.jit.si/finideas-{lead_id}" if priority_score > 75 else None
     }
 
-@app.get("/stats")
-def get_stats():
+@app.post("/process-audio")
+async def process_audio(
+    response: Response,
+    lead_id: str = Form(...),
+    file: UploadFile = File(...),
+    async_job: bool = Form(False),
+    current_user: dict = Depends(get_current_user)
+):
     """
-    Returns total leads and key metrics using direct REST calls.
+    Transcribes and scores a recording. With async_job=true the upload is
+    saved, a job id is returned right away and the pipeline runs in the
+    background; poll GET /jobs/{job_id} for the result.
+    """
+    try:
+        file_path, audio_hash = await run_in_threadpool(audio_storage.save, file.file, file.filename, file.size)
+    except audio_storage.UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    if not async_job:
+        return await run_audio_pipeline(lead_id, file_path, audio_hash, current_user)
+
+    try:
+        job = audio_jobs.submit(
+            lambda: run_audio_pipeline(lead_id, file_path, audio_hash, current_user),
+            lead_id=lead_id
+        )
+    except audio_jobs.JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    response.status_code = 202
+    return {"status": "queued", "job_id": job["id"], "lead_id": lead_id, "status_url": f"/jobs/{job['id']}"}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Returns the status (queued, running, completed, failed) and, once
+    finished, the result or error of an asynchronous audio job.
+    """
+    job = audio_jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+STATS_CACHE_TTL = float(os.environ.get("STATS_CACHE_TTL", "5"))
+stats_cache = TTLCache(maxsize=1, ttl=STATS_CACHE_TTL)
+stats_flight = SingleFlight()
+
+async def fetch_lead_counts() -> dict:
+    """
+    All dashboard counters in one round trip via the lead_stats() RPC from
+    schema.sql. Databases without the function fall back to the four
+    count=exact queries, sent concurrently.
     """
     SUPABASE_URL = os.environ.get("SUPABASE_URL")
     SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
     headers = {"apikey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"}
-    
+    client = get_http_client()
+
+    rpc_res = await client.post(f"{SUPABASE_URL}/rest/v1/rpc/lead_stats", headers=headers, json={})
+    if rpc_res.status_code == 200:
+        return json_body(rpc_res)
+    if rpc_res.status_code != 404:
+        raise Exception(rpc_res.text)
+
+    print("⚠️ [Stats] lead_stats() RPC missing, falling back to separate counts.")
+    filters = {
+        "total_leads": "select=id",
+        "hot_leads": "status=in.(Qualified,Won)&select=id",
+        "meetings_scheduled": "status=eq.Meeting&select=id",
+        "overdue_followups": f"status=eq.Follow-up&reminder_date=lt.{datetime.now().isoformat()}&select=id"
+    }
+    responses = await asyncio.gather(*(
+        client.get(f"{SUPABASE_URL}/rest/v1/leads?{query}", headers={**headers, "Prefer": "count=exact", "Range": "0-0"})
+        for query in filters.values()
+    ))
+    return {
+        name: int(res.headers.get("Content-Range", "0/0").split("/")[1]) if res.status_code in (200, 206) else 0
+        for name, res in zip(filters, responses)
+    }
+
+async def fetch_overdue_count() -> int:
+    SUPABASE_URL = os.environ.get("SUPABASE_URL")
+    SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
+    headers = {"apikey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}", "Prefer": "count=exact", "Range": "0-0"}
+    client = get_http_client()
+    overdue_res = await client.get(
+        f"{SUPABASE_URL}/rest/v1/leads?status=eq.Follow-up&reminder_date=lt.{datetime.now().isoformat()}&select=id",
+        headers=headers
+    )
+    if overdue_res.status_code not in (200, 206):
+        raise Exception(overdue_res.text)
+    return int(overdue_res.headers.get("Content-Range", "0/0").split("/")[1])
+
+async def load_stats() -> dict:
+    if lead_aggregates.ready:
+        # Status counters are maintained in memory; the overdue count comes
+        # from the reminder index once it has been loaded.
+        overdue = reminder_index.overdue_count() if reminder_index.ready else await fetch_overdue_count()
+        counts = {**lead_aggregates.counts(), "overdue_followups": overdue}
+    else:
+        counts = await fetch_lead_counts()
+    total_leads = counts["total_leads"]
+    hot_leads = counts["hot_leads"]
+    stats = {
+        "total_leads": total_leads,
+        "hot_leads": hot_leads,
+        "meetings_scheduled": counts["meetings_scheduled"],
+        "overdue_followups": counts["overdue_followups"],
+        "conversion_rate": f"{(hot_leads / total_leads * 100):.1f}%" if total_leads > 0 else "0%"
+    }
+    stats_cache.set("stats", stats)
+    return stats
+
+@app.get("/stats")
+async def get_stats():
+    """
+    Returns total leads and key metrics. Results are cached for
+    STATS_CACHE_TTL seconds and concurrent refreshes share one query.
+    """
+    stats = stats_cache.get("stats")
+    if stats is not None:
+        return stats
     try:
-        with httpx.Client(timeout=20.0) as client:
-            
-            total_res = client.get(f"{SUPABASE_URL}/rest/v1/leads?select=id", headers={**headers, "Prefer": "count=exact"})
-            total_leads = int(total_res.headers.get("Content-Range", "0/0").split("/")[1]) if total_res.status_code == 200 else 0
-          
-            hot_res = client.get(f"{SUPABASE_URL}/rest/v1/leads?status=in.(Qualified,Won)&select=id", headers={**headers, "Prefer": "count=exact"})
-            hot_leads = int(hot_res.headers.get("Content-Range", "0/0").split("/")[1]) if hot_res.status_code == 200 else 0
-            
-            meet_res = client.get(f"{SUPABASE_URL}/rest/v1/leads?status=eq.Meeting&select=id", headers={**headers, "Prefer": "count=exact"})
-            meetings = int(meet_res.headers.get("Content-Range", "0/0").split("/")[1]) if meet_res.status_code == 200 else 0
-            
-            overdue_res = client.get(f"{SUPABASE_URL}/rest/v1/leads?status=eq.Follow-up&reminder_date=lt.{datetime.now().isoformat()}&select=id", headers={**headers, "Prefer": "count=exact"})
-            overdue_count = int(overdue_res.headers.get("Content-Range", "0/0").split("/")[1]) if overdue_res.status_code == 200 else 0
-
-            return {
-                "total_leads": total_leads,
-                "hot_leads": hot_leads,
-                "meetings_scheduled": meetings,
-                "overdue_followups": overdue_count,
-                "conversion_rate": f"{(hot_leads / total_leads * 100):.1f}%" if total_leads > 0 else "0%"
-            }
+        return await stats_flight.do("stats", load_stats)
     except Exception as e:
         return {"error": str(e)}
 
+async def load_overdue_leads() -> list[dict]:
+    """
+    Rows of the leads reminder_index reports overdue, most overdue first.
+    Rows missing from lead_cache are fetched SYNC_CHUNK_SIZE ids at a time.
+    """
+    ids = reminder_index.overdue()
+    rows = {lead_id: lead_cache.get(lead_id) for lead_id in ids}
+    missing = [lead_id for lead_id, row in rows.items() if row is None]
+    if missing:
+        for lead_id, row in (await fetch_server_rows(missing)).items():
+            lead_cache.put(row)
+            rows[lead_id] = row
+    return [rows[lead_id] for lead_id in ids if rows[lead_id] is not None]
+
 @app.get("/overdue-leads")
-def get_overdue_leads():
+async def get_overdue_leads():
+    if reminder_index.ready:
+        try:
+            return ORJSONResponse(await load_overdue_leads())
+        except Exception as e:
+            return {"error": str(e)}
+
+    cached = lead_cache.all()
+    if cached is not None:
+        now = datetime.now(timezone.utc)
+        return ORJSONResponse([
+            lead for lead in cached
+            if lead.get("status") == "Follow-up" and lead.get("reminder_date") and parse_timestamp(lead["reminder_date"]) < now
+        ])
+
     SUPABASE_URL = os.environ.get("SUPABASE_URL")
     SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
     now = datetime.now().isoformat()
@@ -335,115 +825,476 @@ def get_overdue_leads():
     headers = {"apikey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"}
     
     try:
-        with httpx.Client(timeout=30.0) as client:
-            response = client.get(URL, headers=headers)
-            if response.status_code != 200:
-                raise Exception(response.text)
-            return response.json()
+        client = get_http_client()
+        response = await client.get(URL, headers=headers)
+        if response.status_code != 200:
+            raise Exception(response.text)
+        # Served exactly as PostgREST encoded it.
+        return raw_json(response.content)
     except Exception as e:
         return {"error": str(e)}
 
+conference_cost_cache = TTLCache(maxsize=256, ttl=float(os.environ.get("CONFERENCE_COST_CACHE_TTL", "300")))
+
 @app.get("/conference-roi/{conference_id}")
-def get_conference_roi(conference_id: str):
+async def get_conference_roi(conference_id: str):
     SUPABASE_URL = os.environ.get("SUPABASE_URL")
     SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
     headers = {"apikey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"}
     
     try:
-        with httpx.Client(timeout=30.0) as client:
-            conf_res = client.get(f"{SUPABASE_URL}/rest/v1/conferences?id=eq.{conference_id}&select=cost", headers=headers)
-            if conf_res.status_code != 200 or not conf_res.json():
+        client = get_http_client()
+        cost = conference_cost_cache.get(conference_id)
+        if cost is None:
+            conf_res = await client.get(f"{SUPABASE_URL}/rest/v1/conferences?id=eq.{conference_id}&select=cost", headers=headers)
+            if conf_res.status_code != 200 or not json_body(conf_res):
                 return {"error": "Conference not found or cost not set"}
-            cost = float(conf_res.json()[0]["cost"])
+            cost = float(json_body(conf_res)[0]["cost"])
+            conference_cost_cache.set(conference_id, cost)
 
-            leads_res = client.get(f"{SUPABASE_URL}/rest/v1/leads?conference_id=eq.{conference_id}&status=eq.Won&select=revenue", headers=headers)
+        if lead_aggregates.ready:
+            total_revenue = lead_aggregates.conference_revenue(conference_id)
+        else:
+            leads_res = await client.get(f"{SUPABASE_URL}/rest/v1/leads?conference_id=eq.{conference_id}&status=eq.Won&select=revenue", headers=headers)
             if leads_res.status_code != 200:
                 raise Exception(leads_res.text)
             
-            leads = leads_res.json()
+            leads = json_body(leads_res)
             total_revenue = sum(float(lead.get("revenue") or 0) for lead in leads)
-            
-            roi = (total_revenue - cost) / cost if cost > 0 else 0
-            
-            return {
-                "total_revenue": total_revenue,
-                "cost": cost,
-                "roi_percentage": f"{roi * 100:.1f}%"
-            }
+        
+        roi = (total_revenue - cost) / cost if cost > 0 else 0
+        
+        return {
+            "total_revenue": total_revenue,
+            "cost": cost,
+            "roi_percentage": f"{roi * 100:.1f}%"
+        }
     except Exception as e:
         return {"error": str(e)}
 
-@app.get("/pipeline")
-def get_pipeline():
+async def reconcile_aggregates():
+    """Rebuilds lead_aggregates, dedup_index and reminder_index from one full scan of the columns they track."""
+    fresh = LeadAggregates()
+    fresh_dedup = DedupIndex()
+    fresh_reminders = ReminderIndex()
+    lead_aggregates.begin_rebuild()
+    dedup_index.begin_rebuild()
+    reminder_index.begin_rebuild()
+    try:
+        async for row in iter_leads(leads_query(fields="status,conference_id,revenue,name,email,phone,company,reminder_date")):
+            fresh.apply(row)
+            fresh_dedup.add(row)
+            fresh_reminders.apply(row)
+    except Exception:
+        lead_aggregates.abort_rebuild()
+        dedup_index.abort_rebuild()
+        reminder_index.abort_rebuild()
+        raise
+    lead_aggregates.finish_rebuild(fresh)
+    dedup_index.finish_rebuild(fresh_dedup)
+    reminder_index.finish_rebuild(fresh_reminders)
+
+async def run_aggregate_reconciler():
+    while True:
+        try:
+            await reconcile_aggregates()
+            print(f"📊 [Aggregates] Reconciled {lead_aggregates.counts()['total_leads']} leads, {len(dedup_index)} indexed for dedup, {reminder_index.overdue_count()} follow-ups overdue.")
+        except Exception as e:
+            print(f"⚠️ [Aggregates] Reconcile failed: {e}")
+        await asyncio.sleep(AGGREGATES_RECONCILE_SECONDS)
+
+LEAD_COLUMNS = {
+    "id", "name", "email", "phone", "company", "role", "notes", "status", "reminder_date",
+    "owner_id", "captured_at", "created_at", "updated_at", "social_media_json", "meta_data",
+    "revenue", "conference_id"
+}
+LEADS_PAGE_SIZE = int(os.environ.get("LEADS_PAGE_SIZE", "100"))
+LEADS_MAX_PAGE_SIZE = int(os.environ.get("LEADS_MAX_PAGE_SIZE", "1000"))
+
+def encode_cursor(lead: dict) -> str:
+    """Opaque keyset cursor for the (created_at, id) position of a raw lead row."""
+    return base64.urlsafe_b64encode(json.dumps([lead["created_at"], lead["id"]]).encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        created_at, lead_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(created_at), str(lead_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def leads_query_after(params: dict, lead: dict) -> dict:
+    created_at, lead_id = lead["created_at"], lead["id"]
+    return {**params, "or": f'(created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{lead_id}"))'}
+
+def leads_query(
+    fields: str | None = None,
+    status: str | None = None,
+    owner_id: str | None = None,
+    conference_id: str | None = None,
+    cursor: str | None = None
+) -> dict:
+    """
+    PostgREST query params for leads newest first, keyset-paginated on
+    (created_at, id). fields is a comma-separated projection; id and
+    created_at are always selected so the next cursor can be built.
+    """
+    if fields:
+        columns = [column.strip() for column in fields.split(",") if column.strip()]
+        unknown = [column for column in columns if column not in LEAD_COLUMNS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        select = ",".join(dict.fromkeys(["id", "created_at", *columns]))
+    else:
+        select = "*"
+
+    params = {"select": select, "order": "created_at.desc,id.desc"}
+    if status:
+        statuses = ",".join(f'"{value.strip()}"' for value in status.split(","))
+        params["status"] = f"in.({statuses})"
+    if owner_id:
+        params["owner_id"] = f"eq.{owner_id}"
+    if conference_id:
+        params["conference_id"] = f"eq.{conference_id}"
+    if cursor:
+        created_at, lead_id = decode_cursor(cursor)
+        params = leads_query_after(params, {"created_at": created_at, "id": lead_id})
+    return params
+
+def cached_leads_page(params: dict, status: str | None, owner_id: str | None,
+                      conference_id: str | None, cursor: str | None) -> list[dict] | None:
+    """
+    Applies a leads_query() (its params plus the same filters) to the lead
+    cache's snapshot, or returns None when the snapshot is not fresh.
     """
-    Returns leads grouped by their status.
+    statuses = {value.strip() for value in status.split(",")} if status else None
+    columns = None if params["select"] == "*" else params["select"].split(",")
+
+    def match(lead: dict) -> bool:
+        if statuses and lead.get("status") not in statuses:
+            return False
+        if owner_id and str(lead.get("owner_id")) != owner_id:
+            return False
+        if conference_id and str(lead.get("conference_id")) != conference_id:
+            return False
+        return True
+
+    leads = lead_cache.page(params["limit"], decode_cursor(cursor) if cursor else None, match)
+    if leads is None or columns is None:
+        return leads
+    return [{column: lead.get(column) for column in columns} for lead in leads]
+
+def convert_lead_times(lead: dict):
+    if "captured_at" in lead:
+        lead["captured_at"] = to_ist(lead.get("captured_at"))
+    lead["created_at"] = to_ist(lead.get("created_at"))
+
+LEADS_STREAM_PAGE_SIZE = int(os.environ.get("LEADS_STREAM_PAGE_SIZE", "1000"))
+
+async def iter_leads(params: dict, page_size: int = LEADS_STREAM_PAGE_SIZE):
+    """
+    Yields raw lead rows for a leads_query() page after page, so only one
+    page is held in memory at a time.
     """
     SUPABASE_URL = os.environ.get("SUPABASE_URL")
     SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
-    URL = f"{SUPABASE_URL}/rest/v1/leads?select=*&order=created_at.desc"
     headers = {"apikey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"}
-    
+    client = get_http_client()
+    while True:
+        page_res = await client.get(f"{SUPABASE_URL}/rest/v1/leads", headers=headers, params={**params, "limit": page_size})
+        if page_res.status_code != 200:
+            raise Exception(page_res.text)
+        rows = json_body(page_res)
+        if not rows:
+            return
+        # Taken before the rows are handed out, since consumers rewrite created_at.
+        next_params = leads_query_after(params, rows[-1])
+        for row in rows:
+            yield row
+        if len(rows) < page_size:
+            return
+        params = next_params
+
+async def stream_ndjson(rows, transform, tag: str | None = None):
+    """
+    Encodes rows as NDJSON after transform(row) rewrites each in place. With
+    tag, transform's return value is stored under that key. A failure
+    midway is reported as a final {"error": ...} line.
+    """
     try:
-        with httpx.Client(timeout=30.0) as client:
-            response = client.get(URL, headers=headers)
-            if response.status_code != 200:
-                raise Exception(response.text)
-            leads = response.json()
-        
-      
-        pipeline = {
-            "New": [],
-            "Contacted": [],
-            "Follow-up": [],
-            "Qualified": [],
-            "Meeting": [],
-            "Won": [],
-            "Lost": []
-        }
-        
-        from utils import generate_meeting_link
-        
-        for lead in leads:
-           
-            lead["captured_at"] = to_ist(lead.get("captured_at"))
-            lead["created_at"] = to_ist(lead.get("created_at"))
-            
-            status = lead.get("status", "New")
-            meta_data = lead.get("meta_data", {}) or {}
-            if status in pipeline:
-                
-                if status == "Meeting" or meta_data.get("priority_score", 0) > 75:
-                    lead["meeting_link"] = meta_data.get("meeting_link") or generate_meeting_link(lead.get("name", "Lead"))
-                    
-                pipeline[status].append(lead)
-            else:
-                
-                if "Other" not in pipeline:
-                     pipeline["Other"] = []
-                pipeline["Other"].append(lead)
-                
-        return pipeline
+        async for row in rows:
+            result = transform(row)
+            if tag:
+                row[tag] = result
+            yield dumps(row) + b"\n"
+    except Exception as e:
+        yield dumps({"error": str(e)}) + b"\n"
+
+PIPELINE_STAGES = ["New", "Contacted", "Follow-up", "Qualified", "Meeting", "Won", "Lost"]
+
+def prepare_pipeline_lead(lead: dict) -> str:
+    """
+    Converts a raw lead row for the pipeline view in place (IST times,
+    meeting link) and returns the stage it belongs to.
+    """
+    lead["captured_at"] = to_ist(lead.get("captured_at"))
+    lead["created_at"] = to_ist(lead.get("created_at"))
+    return pipeline_stage(lead)
+
+def pipeline_stage(lead: dict) -> str:
+    """Adds the meeting link where one is due and returns the lead's pipeline stage."""
+    status = lead.get("status", "New")
+    meta_data = lead.get("meta_data", {}) or {}
+    if status not in PIPELINE_STAGES:
+        return "Other"
+    if status == "Meeting" or meta_data.get("priority_score", 0) > 75:
+        lead["meeting_link"] = meta_data.get("meeting_link") or generate_meeting_link(lead.get("name", "Lead"))
+    return status
+
+async def load_all_leads() -> list[dict]:
+    """Every lead newest first, from the lead cache's snapshot when it is fresh."""
+    cached = lead_cache.all()
+    if cached is not None:
+        return cached
+    SUPABASE_URL = os.environ.get("SUPABASE_URL")
+    SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
+    URL = f"{SUPABASE_URL}/rest/v1/leads?select=*&order=created_at.desc,id.desc"
+    headers = {"apikey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"}
+    response = await get_http_client().get(URL, headers=headers)
+    if response.status_code != 200:
+        raise Exception(response.text)
+    leads = json_body(response)
+    lead_cache.load_all(leads)
+    return leads
+
+async def build_pipeline() -> dict:
+    """Every lead grouped by pipeline stage, as returned by GET /pipeline."""
+    leads = await load_all_leads()
+    pipeline = {stage: [] for stage in PIPELINE_STAGES}
+    for lead in convert_times(leads):
+        pipeline.setdefault(pipeline_stage(lead), []).append(lead)
+    return pipeline
+
+@app.get("/pipeline")
+async def get_pipeline(format: str = Query("json", pattern="^(json|ndjson)$")):
+    """
+    Returns leads grouped by their status. format=ndjson streams one lead
+    per line instead, each tagged with its "stage", in constant memory.
+    """
+    if format == "ndjson":
+        return StreamingResponse(
+            stream_ndjson(iter_leads(leads_query()), prepare_pipeline_lead, "stage"),
+            media_type="application/x-ndjson"
+        )
+
+    try:
+        return ORJSONResponse(await build_pipeline())
     except Exception as e:
         return {"error": str(e)}
+
+EVENTS_KEEPALIVE_SECONDS = float(os.environ.get("EVENTS_KEEPALIVE_SECONDS", "15"))
+
+def sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {dumps(data).decode()}\n\n"
+
+def encode_lead_event(event: dict) -> str:
+    """
+    SSE frame for a lead change, built once per event and shared by every
+    client. The full row (from the lead cache) comes with its stage when
+    it is known; otherwise only the changed columns are sent.
+    """
+    if "_sse" not in event:
+        lead = lead_cache.peek(event["id"])
+        if lead is not None:
+            lead.update(event["changes"])
+            data = {"id": event["id"], "stage": prepare_pipeline_lead(lead), "lead": lead}
+        else:
+            data = {"id": event["id"], "changes": event["changes"]}
+            if "status" in event["changes"]:
+                status = event["changes"]["status"]
+                data["stage"] = status if status in PIPELINE_STAGES else "Other"
+        event["_sse"] = sse("lead", data)
+    return event["_sse"]
+
+@app.get("/pipeline/stream")
+async def stream_pipeline(request: Request):
+    """
+    Server-sent events for the pipeline board: a "snapshot" event shaped
+    like GET /pipeline, then a "lead" event per created or changed lead
+    with its stage, and an "overdue" event ({"id", "reminder_date"}) when
+    a follow-up reminder comes due. A client that falls too far behind (or
+    a bulk change such as a rescore) gets a fresh "snapshot" instead of the
+    backlog.
+    """
+    queue = hub.subscribe()
+
+    async def stream():
+        try:
+            yield sse("snapshot", await build_pipeline())
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event["type"] == "resync":
+                    yield sse("snapshot", await build_pipeline())
+                elif event["type"] == "overdue":
+                    yield sse("overdue", {"id": event["id"], "reminder_date": event["reminder_date"]})
+                else:
+                    yield encode_lead_event(event)
+        except Exception as e:
+            yield sse("error", {"error": str(e)})
+        finally:
+            hub.unsubscribe(queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 @app.get("/leads")
-def get_leads():
+async def get_leads(
+    limit: int = Query(LEADS_PAGE_SIZE, ge=1, le=LEADS_MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    fields: str | None = None,
+    status: str | None = None,
+    owner_id: str | None = None,
+    conference_id: str | None = None,
+    format: str = Query("json", pattern="^(json|ndjson)$")
+):
     """
-    Returns a clean, sorted list of all leads in IST.
+    Returns one page of leads, newest first, in IST. Pass the X-Next-Cursor
+    response header back as ?cursor= for the next page; it is absent on the
+    last page. fields= picks columns, and status (comma-separated), owner_id
+    and conference_id filter server-side. format=ndjson ignores limit and
+    streams every matching lead, one per line.
     """
+    if format == "ndjson":
+        params = leads_query(fields, status, owner_id, conference_id, cursor)
+        return StreamingResponse(stream_ndjson(iter_leads(params), convert_lead_times), media_type="application/x-ndjson")
+
     SUPABASE_URL = os.environ.get("SUPABASE_URL")
     SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
-    URL = f"{SUPABASE_URL}/rest/v1/leads?select=*&order=created_at.desc"
+    URL = f"{SUPABASE_URL}/rest/v1/leads"
     headers = {"apikey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"}
+    params = leads_query(fields, status, owner_id, conference_id, cursor)
+    # One extra row tells us whether another page exists.
+    params["limit"] = limit + 1
     
     try:
-        with httpx.Client(timeout=30.0) as client:
-            response = client.get(URL, headers=headers)
-            if response.status_code == 200:
-                leads = response.json()
-                for lead in leads:
-                    lead["captured_at"] = to_ist(lead.get("captured_at"))
-                    lead["created_at"] = to_ist(lead.get("created_at"))
-                return leads
-            return {"error": response.text}
+        leads = cached_leads_page(params, status, owner_id, conference_id, cursor)
+        if leads is None:
+            client = get_http_client()
+            lead_res = await client.get(URL, headers=headers, params=params)
+            if lead_res.status_code != 200:
+                return {"error": lead_res.text}
+            leads = json_body(lead_res)
+        headers = {}
+        if len(leads) > limit:
+            leads = leads[:limit]
+            headers["X-Next-Cursor"] = encode_cursor(leads[-1])
+        return ORJSONResponse(convert_times(leads), headers=headers)
     except Exception as e:
         return {"error": str(e)}
+
+RESCORE_WRITE_CHUNK = int(os.environ.get("RESCORE_WRITE_CHUNK", "500"))
+rescore_state = {"status": "idle"}
+rescore_task: asyncio.Task | None = None
+
+def rescore_page(rows: list[dict]) -> list[dict]:
+    """
+    Scores a page of raw lead rows in one vectorized pass and returns
+    {id, name, meta_data} updates for the leads whose stored scores changed.
+    priority_score is scored from the intent extracted from the lead's call,
+    so it is only refreshed for leads whose meta_data has extracted_intent.
+    """
+    records = [{**row, **(row.get("meta_data") or {})} for row in rows]
+    scores = score_batch(to_columns(records))
+    called = [i for i, row in enumerate(rows) if isinstance((row.get("meta_data") or {}).get("extracted_intent"), dict)]
+    intent_scores = score_batch(to_columns([rows[i]["meta_data"]["extracted_intent"] for i in called]))["priority_score"]
+    priority = {i: int(score) for i, score in zip(called, intent_scores)}
+    updates = []
+    for i, row in enumerate(rows):
+        meta = dict(row.get("meta_data") or {})
+        fresh = {
+            "lead_score": int(scores["lead_score"][i]),
+            "predicted_aua": int(scores["predicted_aua"][i]),
+            "readiness_score": int(scores["readiness_score"][i])
+        }
+        if i in priority:
+            fresh["priority_score"] = priority[i]
+            fresh["is_hot"] = fresh["priority_score"] >= 50
+        if any(meta.get(key) != value for key, value in fresh.items()):
+            updates.append({"id": row["id"], "name": row["name"], "meta_data": {**meta, **fresh}})
+    return updates
+
+async def rescore_all_leads():
+    """Recomputes every lead's stored scores page by page and upserts the changes."""
+    SUPABASE_URL = os.environ.get("SUPABASE_URL")
+    SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
+    headers = {
+        "apikey": SUPABASE_KEY,
+        "Authorization": f"Bearer {SUPABASE_KEY}",
+        "Content-Type": "application/json",
+        "Prefer": "resolution=merge-duplicates,return=minimal"
+    }
+    client = get_http_client()
+
+    page = []
+    async def flush():
+        updates = rescore_page(page)
+        for start in range(0, len(updates), RESCORE_WRITE_CHUNK):
+            chunk = updates[start:start + RESCORE_WRITE_CHUNK]
+            res = await client.post(
+                f"{SUPABASE_URL}/rest/v1/leads",
+                params={"on_conflict": "id", "columns": "id,name,meta_data"},
+                headers=headers,
+                json=chunk
+            )
+            if res.status_code not in [200, 201, 204]:
+                raise Exception(res.text)
+            for update in chunk:
+                lead_cache.apply({"id": update["id"], "meta_data": update["meta_data"]})
+            rescore_state["updated"] += len(chunk)
+        rescore_state["scanned"] += len(page)
+        page.clear()
+
+    async for row in iter_leads(leads_query(fields="name,email,phone,notes,meta_data")):
+        page.append(row)
+        if len(page) >= LEADS_STREAM_PAGE_SIZE:
+            await flush()
+    await flush()
+
+async def run_rescore_job():
+    rescore_state.update({"status": "running", "started_at": datetime.now(timezone.utc).isoformat(), "finished_at": None, "scanned": 0, "updated": 0, "error": None})
+    try:
+        await rescore_all_leads()
+        rescore_state["status"] = "completed"
+        # Too many changes to push one by one; streaming dashboards reload instead.
+        if rescore_state["updated"]:
+            hub.publish(RESYNC)
+        print(f"🎯 [Rescore] {rescore_state['updated']} of {rescore_state['scanned']} leads updated.")
+    except Exception as e:
+        rescore_state.update({"status": "failed", "error": str(e)})
+        print(f"⚠️ [Rescore] Failed after {rescore_state['scanned']} leads: {e}")
+    finally:
+        rescore_state["finished_at"] = datetime.now(timezone.utc).isoformat()
+
+@app.post("/rescore-all", status_code=202)
+async def rescore_all():
+    """
+    Starts recomputing lead_score, predicted_aua, readiness_score and
+    priority_score (for leads with a processed call) with the current rules
+    in scoring.py. Poll GET /rescore-all for progress. Only one run happens at a time.
+    """
+    global rescore_task
+    if rescore_task is not None and not rescore_task.done():
+        raise HTTPException(status_code=409, detail="Rescore already running")
+    rescore_task = asyncio.create_task(run_rescore_job())
+    # Let the job mark itself running before the state is reported.
+    await asyncio.sleep(0)
+    return rescore_state
+
+@app.get("/rescore-all")
+async def get_rescore_status():
+    return rescore_state
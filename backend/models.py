@@ -1,11 +1,23 @@
-from pydantic import BaseModel, Field, EmailStr
-from typing import Optional, List, Dict, Any
+from pydantic import BaseModel, Field, AfterValidator, TypeAdapter, WithJsonSchema
+from pydantic.networks import validate_email
+from typing import Optional, List, Dict, Any, Annotated
 from datetime import datetime
+from functools import lru_cache
+import os
 import uuid
 
+EMAIL_CACHE_SIZE = int(os.environ.get("EMAIL_CACHE_SIZE", "65536"))
+
+@lru_cache(maxsize=EMAIL_CACHE_SIZE)
+def normalize_email_address(value: str) -> str:
+    """EmailStr's check and normalization, memoized since email-validator is slow and syncs repeat addresses."""
+    return validate_email(value)[1]
+
+CachedEmailStr = Annotated[str, AfterValidator(normalize_email_address), WithJsonSchema({"type": "string", "format": "email"})]
+
 class LeadBase(BaseModel):
     name: str
-    email: Optional[EmailStr] = None
+    email: Optional[CachedEmailStr] = None
     phone: Optional[str] = None
     company: Optional[str] = None
     role: Optional[str] = None
@@ -51,3 +63,20 @@ class Interaction(InteractionBase):
 
 class SyncRequest(BaseModel):
     leads: List[LeadCreate]
+
+# Built once: /sync validates raw request bytes with SYNC_REQUEST and turns
+# the leads into DB-ready dicts with one *_LEADS.dump_python() call per batch.
+SYNC_REQUEST = TypeAdapter(SyncRequest)
+SYNC_LEADS = TypeAdapter(List[LeadCreate])
+
+class DeltaLead(LeadCreate):
+    # The server updated_at this copy was based on; needed for edits of existing leads.
+    updated_at: Optional[datetime] = None
+
+class DeltaSyncRequest(BaseModel):
+    device_id: str = Field(min_length=1, max_length=200)
+    cursor: Optional[str] = None
+    idempotency_key: Optional[str] = None
+    leads: List[DeltaLead] = Field(default_factory=list)
+
+DELTA_LEADS = TypeAdapter(List[DeltaLead])
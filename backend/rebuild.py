@@ -0,0 +1,50 @@
+"""
+Full-scan rebuilds shared by the in-memory lead indexes (lead_aggregates,
+dedup_index, reminder_index).
+
+reconcile_aggregates() builds a fresh index from a scan of the leads table
+while the live one keeps serving. Writes the live index sees in the
+meantime are logged and replayed on top of the scan's state when it is
+adopted, so a lead written during the scan is not rolled back to the row
+the scan read.
+"""
+import time
+
+class RebuildableIndex:
+    ready = False
+    reconciled_at: float = None
+    # Writes seen while a full rebuild is running, replayed on top of it.
+    _rebuild_log: list[dict] | None = None
+
+    def _log_write(self, lead: dict):
+        """Called by the index's write method with every row it is given."""
+        if self._rebuild_log is not None:
+            self._rebuild_log.append(dict(lead))
+
+    def _adopt(self, fresh):
+        """Takes over the state of fresh, an index filled by the full scan."""
+        raise NotImplementedError
+
+    def _replay(self, lead: dict):
+        """Applies a write logged during the rebuild."""
+        raise NotImplementedError
+
+    def _rebuilt(self):
+        """Runs after the replay, before the index is marked ready."""
+        pass
+
+    def begin_rebuild(self):
+        self._rebuild_log = []
+
+    def finish_rebuild(self, fresh):
+        """Adopts the state of a full scan built in fresh, then replays writes made during it."""
+        log, self._rebuild_log = self._rebuild_log or [], None
+        self._adopt(fresh)
+        for lead in log:
+            self._replay(lead)
+        self._rebuilt()
+        self.ready = True
+        self.reconciled_at = time.time()
+
+    def abort_rebuild(self):
+        self._rebuild_log = None
@@ -0,0 +1,158 @@
+"""
+In-memory index of follow-up reminders for /overdue-leads and /stats.
+
+Leads with status Follow-up and a reminder_date sit in a min-heap keyed by
+their due time until it passes, then move to the overdue set, so reading
+the overdue leads touches only those k entries. Whichever path moves a
+reminder over (a read, a rebuild or run_scheduler(), which sleeps until the
+next reminder is due or an earlier one is added) publishes an "overdue"
+event for it, for the /pipeline/stream dashboards. Reminders already
+overdue when the index first loads are not announced.
+
+Like lead_aggregates, the index is filled by the periodic full scan and
+fed every lead row the write paths touch; changes made by other processes
+show up after the next scan.
+"""
+import asyncio
+import heapq
+import os
+import time
+from datetime import datetime, timezone
+
+from events import hub
+from rebuild import RebuildableIndex
+
+REMINDER_MAX_SLEEP_SECONDS = float(os.environ.get("REMINDER_MAX_SLEEP_SECONDS", "60"))
+
+def parse_due(value) -> float | None:
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return (dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp()
+
+class ReminderIndex(RebuildableIndex):
+    def __init__(self):
+        # id -> (status, due timestamp) for every lead with a reminder_date
+        self._leads: dict[str, tuple[str | None, float]] = {}
+        self._upcoming: list[tuple[float, str]] = []
+        self._overdue: dict[str, float] = {}
+        # Overdue set from before a rebuild, so those leads are not announced again.
+        self._reported: dict[str, float] = {}
+        self._wakeup: asyncio.Event | None = None
+
+    @staticmethod
+    def _pending(entry: tuple[str | None, float] | None) -> bool:
+        return entry is not None and entry[0] == "Follow-up"
+
+    def apply(self, lead: dict):
+        """
+        Records a lead's status and reminder_date. Keys missing from lead
+        keep their previous value, so partial rows work.
+        """
+        if not lead.get("id"):
+            return
+        self._log_write(lead)
+        lead_id = str(lead["id"])
+        previous = self._leads.get(lead_id)
+        status = lead.get("status") if "status" in lead else (previous[0] if previous else None)
+        due = parse_due(lead["reminder_date"]) if "reminder_date" in lead else (previous[1] if previous else None)
+        if due is None:
+            self._leads.pop(lead_id, None)
+            self._overdue.pop(lead_id, None)
+            return
+        entry = (status, due)
+        if entry == previous:
+            return
+        self._leads[lead_id] = entry
+        self._overdue.pop(lead_id, None)
+        if self._pending(entry):
+            # Superseded heap entries are skipped when they surface.
+            heapq.heappush(self._upcoming, (due, lead_id))
+            if self._wakeup is not None and self._upcoming[0] == (due, lead_id):
+                self._wakeup.set()
+
+    def advance(self, now: float | None = None) -> list[tuple[str, float]]:
+        """
+        Moves reminders that are now due into the overdue set, publishes an
+        "overdue" event for each once the index has loaded, and returns them.
+        """
+        now = time.time() if now is None else now
+        became_due = []
+        while self._upcoming and self._upcoming[0][0] <= now:
+            due, lead_id = heapq.heappop(self._upcoming)
+            entry = self._leads.get(lead_id)
+            if self._pending(entry) and entry[1] == due and lead_id not in self._overdue:
+                self._overdue[lead_id] = due
+                became_due.append((lead_id, due))
+                if self.ready:
+                    hub.publish({
+                        "type": "overdue",
+                        "id": lead_id,
+                        "reminder_date": datetime.fromtimestamp(due, timezone.utc).isoformat()
+                    })
+        return became_due
+
+    def overdue(self) -> list[str]:
+        """Ids of overdue follow-ups, most overdue first."""
+        self.advance()
+        return sorted(self._overdue, key=self._overdue.get)
+
+    def overdue_count(self) -> int:
+        self.advance()
+        return len(self._overdue)
+
+    def next_due(self) -> float | None:
+        while self._upcoming:
+            due, lead_id = self._upcoming[0]
+            entry = self._leads.get(lead_id)
+            if self._pending(entry) and entry[1] == due:
+                return due
+            heapq.heappop(self._upcoming)
+        return None
+
+    def _adopt(self, fresh: "ReminderIndex"):
+        self._reported = self._overdue
+        self._leads = fresh._leads
+        self._upcoming = fresh._upcoming
+        self._overdue = {}
+
+    def _replay(self, lead: dict):
+        self.apply(lead)
+
+    def _rebuilt(self):
+        """Leads already reported overdue stay reported; the rest are announced by advance()."""
+        reported, self._reported = self._reported, {}
+        now = time.time()
+        for due, lead_id in list(self._upcoming):
+            if due <= now and lead_id in reported:
+                self._overdue[lead_id] = due
+        self.advance(now)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "reminders": len(self._leads),
+            "overdue": len(self._overdue),
+            "heap_size": len(self._upcoming),
+            "reconciled_at": self.reconciled_at
+        }
+
+    async def run_scheduler(self):
+        """Publishes an "overdue" event as each follow-up reminder comes due."""
+        self._wakeup = asyncio.Event()
+        while True:
+            self.advance()
+            next_due = self.next_due()
+            timeout = REMINDER_MAX_SLEEP_SECONDS if next_due is None else min(max(next_due - time.time(), 0), REMINDER_MAX_SLEEP_SECONDS)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+reminder_index = ReminderIndex()
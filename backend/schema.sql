@@ -40,6 +40,10 @@ create table public.interactions (
 create index leads_status_idx on public.leads(status);
 create index leads_phone_idx on public.leads(phone);
 create index interactions_lead_id_idx on public.interactions(lead_id);
+-- Keyset pagination and filters of GET /leads
+create index leads_created_at_id_idx on public.leads(created_at desc, id desc);
+create index leads_owner_id_idx on public.leads(owner_id);
+create index leads_conference_id_idx on public.leads(conference_id);
 
 alter table public.leads enable row level security;
 alter table public.interactions enable row level security;
@@ -65,3 +69,52 @@ create table public.conferences (
 
 alter table public.conferences enable row level security;
 create policy "Enable access for service role" on public.conferences as permissive for all to service_role using (true) with check (true);
+
+-- Every /stats counter in a single scan, called as POST /rest/v1/rpc/lead_stats
+create or replace function public.lead_stats()
+returns json
+language sql
+stable
+as $$
+  select json_build_object(
+    'total_leads', count(*),
+    'hot_leads', count(*) filter (where status in ('Qualified', 'Won')),
+    'meetings_scheduled', count(*) filter (where status = 'Meeting'),
+    'overdue_followups', count(*) filter (where status = 'Follow-up' and reminder_date < now())
+  )
+  from public.leads;
+$$;
+
+-- Delta sync (POST /sync/delta): updated_at moves on every update and is the change cursor
+create or replace function public.set_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+  new.updated_at = now();
+  return new;
+end;
+$$;
+
+create trigger leads_set_updated_at
+  before update on public.leads
+  for each row execute function public.set_updated_at();
+
+create index leads_updated_at_id_idx on public.leads(updated_at, id);
+
+-- Fallback overdue queries before the in-memory reminder index has loaded
+create index leads_followup_reminder_idx on public.leads(reminder_date) where status = 'Follow-up';
+
+-- Per-device acknowledged cursor, the leads its last call inserted and the
+-- last response, replayed for a repeated idempotency key
+create table public.sync_devices (
+  device_id text primary key,
+  cursor text,
+  inserted_ids jsonb,
+  last_idempotency_key text,
+  last_response jsonb,
+  last_synced_at timestamptz default now()
+);
+
+alter table public.sync_devices enable row level security;
+create policy "Enable access for service role" on public.sync_devices as permissive for all to service_role using (true) with check (true);
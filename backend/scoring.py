@@ -0,0 +1,235 @@
+"""
+Lead scoring rules and the scalar and vectorized engines that evaluate them.
+
+Each score is a list of declarative rules. A rule knows how to score one
+record (a dict) and a whole column batch (NumPy arrays), and both paths are
+derived from the same parameters, so changing a weight here changes
+calculate_lead_score / calculate_wealth_metrics / calculate_priority_score
+and score_batch together. test_scoring.py checks that they agree.
+
+score_batch() takes a columnar batch: a dict of equal-length sequences, or
+anything indexable by column name such as a pandas DataFrame.
+"""
+import re
+from typing import Any, Mapping, Sequence
+
+import numpy as np
+
+def _column(batch: Mapping[str, Sequence], field: str, size: int, default: Any = None) -> np.ndarray:
+    """The batch's column as an object array; absent columns are filled with default."""
+    try:
+        values = batch[field]
+    except KeyError:
+        column = np.empty(size, dtype=object)
+        column[:] = [default] * size
+        return column
+    column = np.empty(size, dtype=object)
+    column[:] = list(values)
+    return column
+
+def _by_unique(column: np.ndarray, fn) -> np.ndarray:
+    """Applies fn once per distinct value (as str) and broadcasts the results."""
+    uniques, inverse = np.unique(column.astype(str), return_inverse=True)
+    return np.array([fn(value) for value in uniques], dtype=float)[inverse]
+
+class Present:
+    """points when the field is truthy."""
+
+    def __init__(self, field: str, points: int):
+        self.field, self.points = field, points
+
+    def score(self, record: dict) -> float:
+        return self.points if record.get(self.field) else 0
+
+    def score_batch(self, batch, size: int) -> np.ndarray:
+        return _column(batch, self.field, size).astype(bool) * float(self.points)
+
+class AllPresent:
+    """points when every field is truthy, otherwise fallback."""
+
+    def __init__(self, fields: list[str], points: int, fallback: int = 0):
+        self.fields, self.points, self.fallback = fields, points, fallback
+
+    def score(self, record: dict) -> float:
+        return self.points if all(record.get(field) for field in self.fields) else self.fallback
+
+    def score_batch(self, batch, size: int) -> np.ndarray:
+        present = np.ones(size, dtype=bool)
+        for field in self.fields:
+            present &= _column(batch, field, size).astype(bool)
+        return np.where(present, float(self.points), float(self.fallback))
+
+class OneOf:
+    """points when the field equals one of values, otherwise fallback."""
+
+    def __init__(self, field: str, values: list[str], points: int, fallback: int = 0):
+        self.field, self.values, self.points, self.fallback = field, values, points, fallback
+
+    def score(self, record: dict) -> float:
+        return self.points if record.get(self.field) in self.values else self.fallback
+
+    def score_batch(self, batch, size: int) -> np.ndarray:
+        column = _column(batch, self.field, size)
+        matched = np.zeros(size, dtype=bool)
+        for value in self.values:
+            matched |= column == value
+        return np.where(matched, float(self.points), float(self.fallback))
+
+class ContainsAny:
+    """points when the lowercased text field contains any of words."""
+
+    def __init__(self, field: str, words: list[str], points: int):
+        self.field, self.words, self.points = field, words, points
+
+    def score(self, record: dict) -> float:
+        text = (record.get(self.field) or "").lower()
+        return self.points if any(word in text for word in self.words) else 0
+
+    def score_batch(self, batch, size: int) -> np.ndarray:
+        column = _column(batch, self.field, size)
+        text = np.char.lower(np.where(column.astype(bool), column, "").astype(str))
+        matched = np.zeros(size, dtype=bool)
+        for word in self.words:
+            matched |= np.char.find(text, word) >= 0
+        return matched * float(self.points)
+
+class Lookup:
+    """Maps the field's value through table, default for anything else."""
+
+    def __init__(self, field: str, table: dict[str, float], default: float = 0):
+        self.field, self.table, self.default = field, table, default
+
+    def score(self, record: dict) -> float:
+        return self.table.get(record.get(self.field), self.default)
+
+    def score_batch(self, batch, size: int) -> np.ndarray:
+        column = _column(batch, self.field, size)
+        result = np.full(size, float(self.default))
+        for value, points in self.table.items():
+            result[column == value] = points
+        return result
+
+class Scaled:
+    """int(field) * factor, with default used when the field is missing or None."""
+
+    def __init__(self, field: str, factor: int, default: int = 0):
+        self.field, self.factor, self.default = field, factor, default
+
+    def score(self, record: dict) -> float:
+        value = record.get(self.field)
+        return int(self.default if value is None else value) * self.factor
+
+    def score_batch(self, batch, size: int) -> np.ndarray:
+        column = _column(batch, self.field, size, self.default)
+        column[np.equal(column, None)] = self.default
+        # int() truncates toward zero, as np.trunc does; int("3") parses like float("3").
+        return np.trunc(column.astype(float)) * self.factor
+
+TICKET_SIZE_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*(l|lakh|cr|crore)")
+
+class TicketSize:
+    """
+    Parses amounts like "50 lakhs" or "1cr": crore amounts score crore_points,
+    lakh amounts of at least large_lakhs score lakh_points.
+    """
+
+    def __init__(self, field: str, crore_points: int, lakh_points: int, large_lakhs: float):
+        self.field = field
+        self.crore_points, self.lakh_points, self.large_lakhs = crore_points, lakh_points, large_lakhs
+
+    def _points(self, raw: str) -> float:
+        match = TICKET_SIZE_PATTERN.search(raw.lower())
+        if not match:
+            return 0
+        if "cr" in match.group(2):
+            return self.crore_points
+        return self.lakh_points if float(match.group(1)) >= self.large_lakhs else 0
+
+    def score(self, record: dict) -> float:
+        return self._points(str(record.get(self.field, "")))
+
+    def score_batch(self, batch, size: int) -> np.ndarray:
+        # Ticket sizes repeat a lot, so the regex runs once per distinct value.
+        return _by_unique(_column(batch, self.field, size, ""), self._points)
+
+class Score:
+    """A sum of rules, capped at cap."""
+
+    def __init__(self, rules: list, cap: float | None = None):
+        self.rules, self.cap = rules, cap
+
+    def score(self, record: dict) -> int:
+        total = sum(rule.score(record) for rule in self.rules)
+        return int(min(total, self.cap) if self.cap is not None else total)
+
+    def score_batch(self, batch, size: int) -> np.ndarray:
+        total = np.zeros(size)
+        for rule in self.rules:
+            total += rule.score_batch(batch, size)
+        if self.cap is not None:
+            total = np.minimum(total, self.cap)
+        return total.astype(np.int64)
+
+# Contact info and context clues in the notes (post-sync enrichment).
+LEAD_SCORE = Score([
+    Present("email", 10),
+    Present("phone", 10),
+    ContainsAny("notes", ["hni", "investment", "portfolio", "jito", "immediate"], 30),
+])
+
+# AUA prediction: ticket size buckets from the capture form in rupees.
+PREDICTED_AUA = Score([
+    Lookup("ticket_size", {
+        "< 10L": 500000,
+        "10L - 50L": 3000000,
+        "50L - 1Cr": 7500000,
+        "> 1Cr": 15000000
+    }),
+])
+
+# Investor readiness (0-100): Intent (30%), Engagement (40%), Profile Completion (30%).
+READINESS_SCORE = Score([
+    OneOf("intent", ["High"], 30, fallback=15),
+    Scaled("engagement_score", 8, default=1),
+    AllPresent(["email", "phone"], 30, fallback=10),
+], cap=100)
+
+# Priority from the intent extracted out of call transcripts.
+PRIORITY_SCORE = Score([
+    OneOf("urgency", ["High", "Urgent", "Immediate"], 30),
+    TicketSize("ticket_size", crore_points=40, lakh_points=25, large_lakhs=50),
+    OneOf("investor_type", ["HNI", "Institutional", "Wealthy"], 20),
+    OneOf("investment_type", ["PMS", "AIF", "Equity"], 15),
+], cap=100)
+
+def calculate_lead_score(lead: dict) -> int:
+    """Ranks leads based on contact info and context clues."""
+    return LEAD_SCORE.score(lead)
+
+def calculate_wealth_metrics(lead_data: dict) -> dict:
+    return {
+        "predicted_aua": PREDICTED_AUA.score(lead_data),
+        "readiness_score": READINESS_SCORE.score(lead_data)
+    }
+
+def calculate_priority_score(data: dict) -> int:
+    return PRIORITY_SCORE.score(data)
+
+def to_columns(records: list[dict]) -> dict[str, list]:
+    """Turns records into a columnar batch; keys missing from a record become None."""
+    fields = {key for record in records for key in record}
+    return {field: [record.get(field) for record in records] for field in fields}
+
+def score_batch(batch: Mapping[str, Sequence]) -> dict[str, np.ndarray]:
+    """
+    Computes every score for a columnar batch. Returns int64 arrays keyed
+    lead_score, predicted_aua, readiness_score and priority_score.
+    """
+    first = next(iter(batch), None)
+    size = 0 if first is None else len(batch[first])
+    return {
+        "lead_score": LEAD_SCORE.score_batch(batch, size),
+        "predicted_aua": PREDICTED_AUA.score_batch(batch, size),
+        "readiness_score": READINESS_SCORE.score_batch(batch, size),
+        "priority_score": PRIORITY_SCORE.score_batch(batch, size)
+    }
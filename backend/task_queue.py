@@ -0,0 +1,221 @@
+"""
+Durable background task queue backed by a local SQLite file.
+
+Tasks are enqueued as JSON payloads under a kind with a registered async
+handler. TASK_WORKERS workers claim up to TASK_BATCH_SIZE queued tasks of one
+kind at a time and hand the handler the whole batch. A claimed task stays
+invisible to other workers for TASK_VISIBILITY_TIMEOUT seconds, so if its
+process dies it is picked up again once the timeout passes. Failed tasks are
+retried with exponential backoff; after TASK_MAX_ATTEMPTS they are parked
+with status "dead" and their last error.
+
+Handlers take a list of payloads and return {index: error} for the payloads
+that failed (or None if all succeeded); raising fails the whole batch. A
+failed payload is stored again as the handler left it, so handlers can
+record finished steps in it and skip them on the retry.
+
+Every SQLite call blocks (begin immediate can wait up to 30s for the write
+lock), so the workers run them with asyncio.to_thread and callers on the
+event loop should do the same with enqueue().
+"""
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Awaitable, Callable
+
+TASK_QUEUE_PATH = os.environ.get("TASK_QUEUE_PATH", "data/tasks.sqlite3")
+TASK_WORKERS = int(os.environ.get("TASK_WORKERS", "2"))
+TASK_BATCH_SIZE = int(os.environ.get("TASK_BATCH_SIZE", "500"))
+TASK_VISIBILITY_TIMEOUT = float(os.environ.get("TASK_VISIBILITY_TIMEOUT", "300"))
+TASK_MAX_ATTEMPTS = int(os.environ.get("TASK_MAX_ATTEMPTS", "5"))
+TASK_RETRY_BASE_SECONDS = float(os.environ.get("TASK_RETRY_BASE_SECONDS", "2"))
+TASK_RETRY_MAX_SECONDS = float(os.environ.get("TASK_RETRY_MAX_SECONDS", "600"))
+TASK_POLL_SECONDS = float(os.environ.get("TASK_POLL_SECONDS", "1"))
+
+Handler = Callable[[list], Awaitable[dict[int, str] | None]]
+
+_lock = threading.Lock()
+_conn: sqlite3.Connection = None
+_handlers: dict[str, Handler] = {}
+_workers: list[asyncio.Task] = []
+_wakeup: asyncio.Event = None
+_loop: asyncio.AbstractEventLoop = None
+stats = {"completed": 0, "retried": 0, "gave_up": 0}
+
+def _connection() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        directory = os.path.dirname(TASK_QUEUE_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        _conn = sqlite3.connect(TASK_QUEUE_PATH, check_same_thread=False, isolation_level=None, timeout=30)
+        _conn.execute("pragma journal_mode=wal")
+        _conn.execute("""
+            create table if not exists tasks (
+                id integer primary key autoincrement,
+                kind text not null,
+                payload text not null,
+                status text not null default 'queued',
+                attempts integer not null default 0,
+                available_at real not null,
+                created_at real not null,
+                last_error text
+            )
+        """)
+        _conn.execute("create index if not exists tasks_status_available_idx on tasks(status, available_at)")
+    return _conn
+
+def register(kind: str, handler: Handler):
+    _handlers[kind] = handler
+
+def enqueue(kind: str, payloads: list) -> int:
+    """Durably queues one task per payload and wakes the workers."""
+    now = time.time()
+    with _lock:
+        conn = _connection()
+        conn.execute("begin immediate")
+        try:
+            conn.executemany(
+                "insert into tasks (kind, payload, available_at, created_at) values (?, ?, ?, ?)",
+                [(kind, json.dumps(payload, default=str), now, now) for payload in payloads]
+            )
+            conn.execute("commit")
+        except Exception:
+            conn.execute("rollback")
+            raise
+    if _wakeup is not None:
+        # enqueue() runs in a worker thread; asyncio.Event is not thread-safe.
+        _loop.call_soon_threadsafe(_wakeup.set)
+    return len(payloads)
+
+def _claim() -> list[dict]:
+    """Leases the next batch of visible tasks, all of the oldest task's kind."""
+    now = time.time()
+    with _lock:
+        conn = _connection()
+        conn.execute("begin immediate")
+        try:
+            first = conn.execute(
+                "select kind from tasks where status = 'queued' and available_at <= ? order by id limit 1", (now,)
+            ).fetchone()
+            if first is None:
+                conn.execute("commit")
+                return []
+            rows = conn.execute(
+                "select id, payload, attempts from tasks where status = 'queued' and available_at <= ? and kind = ? order by id limit ?",
+                (now, first[0], TASK_BATCH_SIZE)
+            ).fetchall()
+            conn.executemany(
+                "update tasks set attempts = attempts + 1, available_at = ? where id = ?",
+                [(now + TASK_VISIBILITY_TIMEOUT, row[0]) for row in rows]
+            )
+            conn.execute("commit")
+        except Exception:
+            conn.execute("rollback")
+            raise
+    return [{"id": row[0], "kind": first[0], "payload": json.loads(row[1]), "attempts": row[2] + 1} for row in rows]
+
+def _backoff(attempts: int) -> float:
+    delay = min(TASK_RETRY_BASE_SECONDS * 2 ** (attempts - 1), TASK_RETRY_MAX_SECONDS)
+    return delay * random.uniform(1, 1.25)
+
+def _complete(batch: list[dict], failures: dict[int, str]):
+    """Deletes the tasks that succeeded and schedules retries for the rest."""
+    now = time.time()
+    done, retry, dead = [], [], []
+    for index, task in enumerate(batch):
+        if index not in failures:
+            done.append((task["id"],))
+        elif task["attempts"] >= TASK_MAX_ATTEMPTS:
+            dead.append((failures[index], task["id"]))
+        else:
+            retry.append((now + _backoff(task["attempts"]), failures[index], json.dumps(task["payload"], default=str), task["id"]))
+    with _lock:
+        conn = _connection()
+        conn.execute("begin immediate")
+        try:
+            conn.executemany("delete from tasks where id = ?", done)
+            conn.executemany("update tasks set available_at = ?, last_error = ?, payload = ? where id = ?", retry)
+            conn.executemany("update tasks set status = 'dead', last_error = ? where id = ?", dead)
+            conn.execute("commit")
+        except Exception:
+            conn.execute("rollback")
+            raise
+    stats["completed"] += len(done)
+    stats["retried"] += len(retry)
+    stats["gave_up"] += len(dead)
+    for error, task_id in dead:
+        print(f"❌ [Task Queue] Task {task_id} ({batch[0]['kind']}) gave up after {TASK_MAX_ATTEMPTS} attempts: {error}")
+
+def _release(batch: list[dict]):
+    """Makes leased tasks visible again right away, without using up an attempt."""
+    with _lock:
+        _connection().executemany(
+            "update tasks set attempts = attempts - 1, available_at = ? where id = ?",
+            [(time.time(), task["id"]) for task in batch]
+        )
+
+async def _run_batch(batch: list[dict]):
+    handler = _handlers.get(batch[0]["kind"])
+    try:
+        if handler is None:
+            raise Exception(f"No handler registered for {batch[0]['kind']}")
+        # Past the visibility timeout another worker may already have the batch.
+        failures = await asyncio.wait_for(
+            handler([task["payload"] for task in batch]), TASK_VISIBILITY_TIMEOUT
+        ) or {}
+    except asyncio.CancelledError:
+        await asyncio.to_thread(_release, batch)
+        raise
+    except Exception as e:
+        print(f"⚠️ [Task Queue] Batch of {len(batch)} {batch[0]['kind']} tasks failed: {e}")
+        failures = {index: str(e) for index in range(len(batch))}
+    await asyncio.to_thread(_complete, batch, failures)
+
+async def _worker():
+    while True:
+        try:
+            # Cleared before claiming so an enqueue in between is not missed.
+            _wakeup.clear()
+            batch = await asyncio.to_thread(_claim)
+            if batch:
+                await _run_batch(batch)
+                continue
+            try:
+                await asyncio.wait_for(_wakeup.wait(), TASK_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ [Task Queue] Worker error: {e}")
+            await asyncio.sleep(TASK_POLL_SECONDS)
+
+def start():
+    global _wakeup, _loop
+    _wakeup = asyncio.Event()
+    _loop = asyncio.get_running_loop()
+    for _ in range(TASK_WORKERS):
+        _workers.append(asyncio.create_task(_worker()))
+
+async def shutdown():
+    """Stops the workers; batches they were running go back to the queue."""
+    for worker in _workers:
+        worker.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+def get_stats() -> dict:
+    with _lock:
+        rows = _connection().execute("select status, count(*) from tasks group by status").fetchall()
+    counts = dict(rows)
+    return {
+        **stats,
+        "queued": counts.get("queued", 0),
+        "dead": counts.get("dead", 0),
+        "workers": TASK_WORKERS
+    }
@@ -0,0 +1,85 @@
+"""
+Checks that score_batch agrees with the scalar scoring functions, and times both.
+
+    python test_scoring.py [--leads 100000]
+"""
+import argparse
+import random
+import time
+
+from scoring import (
+    calculate_lead_score, calculate_wealth_metrics, calculate_priority_score,
+    score_batch, to_columns
+)
+
+CHOICES = {
+    "email": ["a@example.com", "", None],
+    "phone": ["9876543210", "", None],
+    "notes": ["HNI client", "wants a Portfolio review", "met at JITO", "call later", "", None],
+    "ticket_size": ["< 10L", "10L - 50L", "50L - 1Cr", "> 1Cr", "50 Lakhs", "2 crore", "20l", "1.5 Cr", "", None, 75],
+    "intent": ["High", "Medium", "Low", None],
+    "engagement_score": [0, 1, 3, 5, "2", 4.7, None],
+    "urgency": ["High", "Urgent", "Immediate", "Low", None],
+    "investor_type": ["HNI", "Institutional", "Wealthy", "Retail", None],
+    "investment_type": ["PMS", "AIF", "Equity", "Debt", None],
+}
+
+def make_leads(count: int, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    leads = []
+    for _ in range(count):
+        # Drop some keys entirely so missing columns and missing keys are both covered.
+        leads.append({field: rng.choice(values) for field, values in CHOICES.items() if rng.random() > 0.1})
+    return leads
+
+def scalar_scores(lead: dict) -> dict:
+    return {
+        "lead_score": calculate_lead_score(lead),
+        **calculate_wealth_metrics(lead),
+        "priority_score": calculate_priority_score(lead)
+    }
+
+def test_parity(count: int = 5000):
+    leads = make_leads(count)
+    batch = score_batch(to_columns(leads))
+    for i, lead in enumerate(leads):
+        expected = scalar_scores(lead)
+        actual = {key: int(values[i]) for key, values in batch.items()}
+        assert actual == expected, f"lead {i} {lead}: scalar {expected} != batch {actual}"
+
+def test_missing_columns():
+    batch = score_batch({"email": ["a@example.com", None]})
+    assert list(batch["lead_score"]) == [10, 0]
+    # intent 15 + default engagement 8 + incomplete profile 10
+    assert list(batch["readiness_score"]) == [33, 33]
+    assert list(batch["predicted_aua"]) == [0, 0]
+
+def test_empty_batch():
+    assert all(len(values) == 0 for values in score_batch({}).values())
+
+def test_known_values():
+    lead = {"email": "a@example.com", "phone": "98", "notes": "Immediate investment", "ticket_size": "> 1Cr",
+            "intent": "High", "engagement_score": 5, "urgency": "Urgent", "investor_type": "HNI", "investment_type": "PMS"}
+    assert scalar_scores(lead) == {"lead_score": 50, "predicted_aua": 15000000, "readiness_score": 100, "priority_score": 100}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leads", type=int, default=100000)
+    args = parser.parse_args()
+
+    test_known_values()
+    test_missing_columns()
+    test_empty_batch()
+    test_parity()
+    print("Parity: scalar and batch scores agree.")
+
+    leads = make_leads(args.leads)
+    started = time.perf_counter()
+    for lead in leads:
+        scalar_scores(lead)
+    scalar_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    score_batch(to_columns(leads))
+    batch_elapsed = time.perf_counter() - started
+    print(f"{args.leads} leads: scalar {scalar_elapsed:.3f}s, batch {batch_elapsed:.3f}s ({scalar_elapsed / batch_elapsed:.1f}x)")
@@ -0,0 +1,44 @@
+"""
+Checks trim_silence on short and padded recordings.
+
+    python test_transcription.py
+"""
+import numpy as np
+
+from transcription import trim_silence, SAMPLE_RATE, VAD_FRAME_MS, VAD_PAD_MS
+
+FRAME = SAMPLE_RATE * VAD_FRAME_MS // 1000
+PAD = VAD_PAD_MS // VAD_FRAME_MS
+
+def tone(seconds: float) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+
+def silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * SAMPLE_RATE), np.float32)
+
+def test_sub_second_clips():
+    # Shorter than the padding kernel, which used to make the mask longer than the audio.
+    for seconds in [0.01, 0.03, 0.1, 0.3, 0.5, 0.51, 0.9]:
+        speech = tone(seconds)
+        assert len(trim_silence(speech)) == len(speech), f"{seconds}s of speech was trimmed"
+        if seconds * 1000 >= VAD_FRAME_MS:
+            assert len(trim_silence(silence(seconds))) == 0, f"{seconds}s of silence was kept"
+
+def test_padding_around_speech():
+    audio = np.concatenate([silence(2), tone(0.3), silence(2)])
+    kept = len(trim_silence(audio))
+    speech_frames = -(-int(0.3 * SAMPLE_RATE) // FRAME) + 1
+    assert kept <= (speech_frames + 2 * PAD) * FRAME, kept
+    assert kept >= int(0.3 * SAMPLE_RATE) + 2 * (PAD - 1) * FRAME, kept
+
+def test_leading_speech_is_not_shifted():
+    # Speech right at the start keeps its padding only after it, not before.
+    audio = np.concatenate([tone(0.09), silence(2)])
+    assert len(trim_silence(audio)) == (3 + PAD) * FRAME
+
+if __name__ == "__main__":
+    test_sub_second_clips()
+    test_padding_around_speech()
+    test_leading_speech_is_not_shifted()
+    print("✅ trim_silence handles sub-second and padded recordings.")
@@ -0,0 +1,98 @@
+"""
+Persistent transcript cache keyed by the SHA-256 of the uploaded audio.
+
+Entries live in a local SQLite file so they survive restarts and are shared
+by every worker on the box. When the stored transcripts and intents exceed
+TRANSCRIPT_CACHE_MAX_BYTES, the least recently used entries are evicted.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+TRANSCRIPT_CACHE_PATH = os.environ.get("TRANSCRIPT_CACHE_PATH", "cache/transcripts.sqlite3")
+TRANSCRIPT_CACHE_MAX_BYTES = int(os.environ.get("TRANSCRIPT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+_lock = threading.Lock()
+_conn: sqlite3.Connection = None
+stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+def _connection() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        directory = os.path.dirname(TRANSCRIPT_CACHE_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        _conn = sqlite3.connect(TRANSCRIPT_CACHE_PATH, check_same_thread=False, isolation_level=None)
+        _conn.execute("pragma journal_mode=wal")
+        _conn.execute("""
+            create table if not exists transcripts (
+                audio_hash text primary key,
+                transcript text not null,
+                intent text,
+                size integer not null,
+                last_access real not null
+            )
+        """)
+        _conn.execute("create index if not exists transcripts_last_access_idx on transcripts(last_access)")
+    return _conn
+
+def get(audio_hash: str) -> dict | None:
+    """
+    Returns {"transcript": str, "intent": dict | None} for a known recording.
+    intent is None when extraction has not succeeded for it yet.
+    """
+    with _lock:
+        conn = _connection()
+        row = conn.execute(
+            "select transcript, intent from transcripts where audio_hash = ?", (audio_hash,)
+        ).fetchone()
+        if row is None:
+            stats["misses"] += 1
+            return None
+        conn.execute("update transcripts set last_access = ? where audio_hash = ?", (time.time(), audio_hash))
+        stats["hits"] += 1
+    return {"transcript": row[0], "intent": json.loads(row[1]) if row[1] else None}
+
+def contains(audio_hash: str) -> bool:
+    with _lock:
+        return _connection().execute(
+            "select 1 from transcripts where audio_hash = ?", (audio_hash,)
+        ).fetchone() is not None
+
+def put(audio_hash: str, transcript: str, intent: dict | None):
+    intent_json = json.dumps(intent) if intent else None
+    size = len(transcript.encode()) + len((intent_json or "").encode())
+    with _lock:
+        conn = _connection()
+        conn.execute(
+            "insert or replace into transcripts (audio_hash, transcript, intent, size, last_access) values (?, ?, ?, ?, ?)",
+            (audio_hash, transcript, intent_json, size, time.time())
+        )
+        _evict(conn)
+
+def _evict(conn: sqlite3.Connection):
+    total = conn.execute("select coalesce(sum(size), 0) from transcripts").fetchone()[0]
+    if total <= TRANSCRIPT_CACHE_MAX_BYTES:
+        return
+    for audio_hash, size in conn.execute("select audio_hash, size from transcripts order by last_access").fetchall():
+        conn.execute("delete from transcripts where audio_hash = ?", (audio_hash,))
+        stats["evictions"] += 1
+        total -= size
+        if total <= TRANSCRIPT_CACHE_MAX_BYTES:
+            break
+
+def get_stats() -> dict:
+    with _lock:
+        entries, total = _connection().execute(
+            "select count(*), coalesce(sum(size), 0) from transcripts"
+        ).fetchone()
+    lookups = stats["hits"] + stats["misses"]
+    return {
+        **stats,
+        "hit_ratio": round(stats["hits"] / lookups, 3) if lookups else 0.0,
+        "entries": entries,
+        "bytes": total,
+        "max_bytes": TRANSCRIPT_CACHE_MAX_BYTES
+    }
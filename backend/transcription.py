@@ -0,0 +1,175 @@
+"""
+Whisper transcription in a pool of worker processes.
+
+The API processes never import torch or whisper: jobs go through the pool's
+call queue to worker processes, each of which loads the model once when it
+starts. The pool itself is only created on the first transcription, so
+workers that never serve /process-audio pay nothing.
+
+transcribe_recording() adds a preprocessing stage in the API process: the
+file is decoded once with ffmpeg, silent spans are dropped with an energy
+based VAD, and long audio is cut into overlapping chunks that the pool
+transcribes in parallel before the texts are stitched back together.
+"""
+import asyncio
+import multiprocessing
+import os
+import re
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+WHISPER_MODEL = os.environ.get("WHISPER_MODEL", "base")
+WHISPER_WORKERS = int(os.environ.get("WHISPER_WORKERS", "1"))
+TRANSCRIBE_PREPROCESS = os.environ.get("TRANSCRIBE_PREPROCESS", "true").lower() != "false"
+TRANSCRIBE_CHUNK_SECONDS = float(os.environ.get("TRANSCRIBE_CHUNK_SECONDS", "30"))
+TRANSCRIBE_CHUNK_OVERLAP_SECONDS = float(os.environ.get("TRANSCRIBE_CHUNK_OVERLAP_SECONDS", "2"))
+VAD_THRESHOLD_DB = float(os.environ.get("VAD_THRESHOLD_DB", "-40"))
+VAD_FRAME_MS = 30
+# Speech frames are padded by this much on each side, which also keeps
+# pauses shorter than twice the padding.
+VAD_PAD_MS = int(os.environ.get("VAD_PAD_MS", "250"))
+
+SAMPLE_RATE = 16000
+
+# Set inside each worker process by _load_model.
+_model = None
+
+_pool: ProcessPoolExecutor = None
+
+def _load_model(model_name: str):
+    global _model
+    import whisper
+    print(f"🎙️ [Whisper] Worker {os.getpid()} loading '{model_name}' model...")
+    _model = whisper.load_model(model_name)
+
+def _transcribe(audio) -> dict:
+    result = _model.transcribe(audio)
+    return {"text": result.get("text", ""), "language": result.get("language")}
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn keeps the event loop, sockets and threads of the API process
+        # out of the workers.
+        _pool = ProcessPoolExecutor(
+            max_workers=WHISPER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_load_model,
+            initargs=(WHISPER_MODEL,)
+        )
+    return _pool
+
+async def transcribe(audio) -> dict:
+    """
+    Transcribes a file path (or 16 kHz mono float32 array) in the worker pool.
+    Returns {"text": ..., "language": ...}.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(get_pool(), _transcribe, audio)
+    except BrokenProcessPool:
+        # A worker died (usually out of memory); start a fresh pool for the next job.
+        shutdown_pool()
+        raise
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def decode_audio(file_path: str) -> np.ndarray:
+    """Decodes any ffmpeg-readable file to 16 kHz mono float32, as whisper.load_audio does."""
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0", "-i", file_path,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "-"
+    ]
+    out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+
+def trim_silence(audio: np.ndarray) -> np.ndarray:
+    """Drops frames quieter than VAD_THRESHOLD_DB (dBFS), keeping VAD_PAD_MS around speech."""
+    frame = SAMPLE_RATE * VAD_FRAME_MS // 1000
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return audio
+
+    frames = audio[:n_frames * frame].reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1) + 1e-12)
+    voiced = 20 * np.log10(rms) > VAD_THRESHOLD_DB
+    pad = VAD_PAD_MS // VAD_FRAME_MS
+    if pad:
+        # "full" keeps frame i at index i + pad even when the kernel is longer
+        # than the recording, which "same" does not.
+        voiced = np.convolve(voiced, np.ones(2 * pad + 1))[pad:pad + n_frames] > 0
+
+    keep = np.repeat(voiced, frame)
+    # The partial frame at the end follows the last full frame.
+    tail = audio[n_frames * frame:] if voiced[-1] else audio[:0]
+    return np.concatenate([audio[:n_frames * frame][keep], tail])
+
+def split_chunks(audio: np.ndarray) -> list[np.ndarray]:
+    """Cuts audio into TRANSCRIBE_CHUNK_SECONDS windows overlapping by TRANSCRIBE_CHUNK_OVERLAP_SECONDS."""
+    size = int(TRANSCRIBE_CHUNK_SECONDS * SAMPLE_RATE)
+    overlap = int(TRANSCRIBE_CHUNK_OVERLAP_SECONDS * SAMPLE_RATE)
+    if len(audio) <= size:
+        return [audio]
+    step = max(size - overlap, 1)
+    chunks = []
+    for start in range(0, len(audio), step):
+        chunks.append(audio[start:start + size])
+        if start + size >= len(audio):
+            break
+    return chunks
+
+def _words(text: str) -> list[str]:
+    return [re.sub(r"[^\w]", "", word.lower()) for word in text.split()]
+
+def stitch_transcripts(texts: list[str], max_overlap_words: int | None = None) -> str:
+    """
+    Joins chunk transcripts, dropping words that the overlap made both
+    neighbours transcribe (longest matching suffix/prefix run). The run is
+    capped at what the overlap can hold, about four words a second.
+    """
+    if max_overlap_words is None:
+        max_overlap_words = max(3, int(TRANSCRIBE_CHUNK_OVERLAP_SECONDS * 4))
+    stitched = []
+    for text in texts:
+        words = text.split()
+        if stitched and words:
+            tail, head = _words(" ".join(stitched[-max_overlap_words:])), _words(" ".join(words[:max_overlap_words]))
+            for k in range(min(len(tail), len(head)), 0, -1):
+                if tail[-k:] == head[:k]:
+                    words = words[k:]
+                    break
+        stitched.extend(words)
+    return " ".join(stitched)
+
+async def transcribe_recording(file_path: str) -> dict:
+    """
+    Decodes, trims and (for long audio) chunks a recording, transcribing the
+    chunks in parallel. Falls back to handing the file straight to Whisper
+    when preprocessing is disabled or ffmpeg cannot decode it.
+    """
+    if not TRANSCRIBE_PREPROCESS:
+        return await transcribe(file_path)
+    try:
+        audio = await asyncio.to_thread(decode_audio, file_path)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"⚠️ [Whisper] Could not decode {file_path} ({e}), transcribing the file directly.")
+        return await transcribe(file_path)
+
+    speech = await asyncio.to_thread(trim_silence, audio)
+    print(f"🎙️ [Whisper] {len(audio) / SAMPLE_RATE:.1f}s decoded, {len(speech) / SAMPLE_RATE:.1f}s after silence trimming")
+    if len(speech) == 0:
+        return {"text": "", "language": None}
+
+    chunks = split_chunks(speech)
+    results = await asyncio.gather(*(transcribe(chunk) for chunk in chunks))
+    return {
+        "text": stitch_transcripts([result.get("text", "") for result in results]),
+        "language": results[0].get("language")
+    }
@@ -18,25 +18,247 @@ def generate_meeting_link(lead_name: str) -> str:
     clean_name = "".join(filter(str.isalnum, lead_name))
     return f"https://meet.jit.si/FinSync_{clean_name}_{str(uuid.uuid4())[:6]}"
 
-def calculate_lead_score(lead: dict) -> int:
-    """Ranks leads based on contact info and context clues."""
-    score = 0
-    if lead.get("email"): score += 10
-    if lead.get("phone"): score += 10
-    
-   
-    notes = (lead.get("notes") or "").lower()
-    high_intent = ["hni", "investment", "portfolio", "jito", "immediate"]
-    if any(word in notes for word in high_intent):
-        score += 30
-    return score
-
 import httpx
 import os
+from database import get_http_client
+from fastjson import json_body
+from aggregates import lead_aggregates
+from lead_cache import lead_cache
+from events import hub
+from reminders import reminder_index
+from scoring import calculate_lead_score, calculate_wealth_metrics, score_batch, to_columns
+
+SYNC_CHUNK_SIZE = int(os.environ.get("SYNC_CHUNK_SIZE", "500"))
+
+async def insert_leads_individually(client: httpx.AsyncClient, rest_url: str, headers: dict, rows: list[dict]):
+    """
+    Inserts leads one POST at a time. Returns (saved_rows, skipped_count),
+    where saved_rows are the lead rows PostgREST returned.
+    """
+    new_leads = []
+    skipped = 0
+    for row in rows:
+        lead_name = row.get("name")
+        try:
+            response = await client.post(rest_url, headers=headers, json=row)
+            print(f"   📡 Result: {response.status_code}")
 
-def process_leads_background(new_leads: list[dict]):
+            if response.status_code in [201, 200]:
+                data = json_body(response)
+                if data:
+                    new_leads.append(data[0])
+                    print(f"Saved Successfully: {lead_name}")
+                else:
+                    print(f"Success but No Data Returned for {lead_name}")
+            elif response.status_code == 409:
+                print(f"Duplicate Conflict (409): {lead_name}. Details: {response.text}")
+                skipped += 1
+            else:
+                print(f"DB REJECTED ({response.status_code}): {response.text}")
+                skipped += 1
+        except Exception as e:
+            print(f"Fatal Exception for {lead_name}: {str(e)}")
+            skipped += 1
+    return new_leads, skipped
+
+def match_inserted_rows(rows: list[dict], inserted: list[dict]) -> list[dict | None]:
+    """
+    Pairs each submitted row with the row PostgREST returned for it, or None
+    if the insert was ignored as a duplicate. Rows are matched by client id,
+    then by email; rows with neither can never conflict and take the
+    remaining returned rows in order.
     """
-    Handles enrichment and scoring in a background threadpool.
+    by_id = {str(row["id"]): row for row in inserted}
+    by_email = {}
+    for row in inserted:
+        if row.get("email"):
+            by_email.setdefault(row["email"], row)
+
+    submitted_ids = {str(row["id"]) for row in rows if row.get("id")}
+    submitted_emails = {row["email"] for row in rows if not row.get("id") and row.get("email")}
+    unkeyed = iter([
+        row for row in inserted
+        if str(row["id"]) not in submitted_ids and row.get("email") not in submitted_emails
+    ])
+
+    claimed = set()
+    matches = []
+    for row in rows:
+        found = None
+        if row.get("id"):
+            found = by_id.get(str(row["id"]))
+        elif row.get("email"):
+            found = by_email.get(row["email"])
+        else:
+            found = next(unkeyed, None)
+        if found is not None and str(found["id"]) in claimed:
+            found = None
+        if found is not None:
+            claimed.add(str(found["id"]))
+        matches.append(found)
+    return matches
+
+async def drop_existing_ids(client: httpx.AsyncClient, rest_url: str, headers: dict, rows: list[dict]):
+    """
+    Removes rows whose client id is already in the table (a device resending
+    leads after a partial sync) or repeated earlier in rows, so they count
+    as duplicates instead of failing a bulk insert on the primary key.
+    Returns (rows, dropped_count); if the lookup fails rows are kept.
+    """
+    ids = list(dict.fromkeys(str(row["id"]) for row in rows if row.get("id")))
+    if not ids:
+        return rows, 0
+    try:
+        response = await client.get(rest_url, headers=headers, params={"id": f"in.({','.join(ids)})", "select": "id"})
+        if response.status_code != 200:
+            raise Exception(f"{response.status_code}: {response.text}")
+        existing = {str(row["id"]) for row in json_body(response)}
+    except Exception as e:
+        print(f"[Sync] Could not check {len(ids)} lead ids before insert: {e}")
+        return rows, 0
+
+    kept = []
+    seen = set()
+    for row in rows:
+        lead_id = str(row["id"]) if row.get("id") else None
+        if lead_id and (lead_id in existing or lead_id in seen):
+            print(f"Already synced: {row.get('name')}")
+            continue
+        if lead_id:
+            seen.add(lead_id)
+        kept.append(row)
+    return kept, len(rows) - len(kept)
+
+async def insert_leads_bulk(client: httpx.AsyncClient, rest_url: str, headers: dict, rows: list[dict]):
+    """
+    Inserts leads as chunked array POSTs, letting PostgREST skip email
+    conflicts (resolution=ignore-duplicates). Returns (saved_rows, skipped_count)
+    with the same per-lead accounting as insert_leads_individually. A chunk
+    the database rejects outright is retried lead by lead so one bad row
+    only costs its own insert. Leads whose id already exists are counted as
+    duplicates up front, since a primary key conflict rejects the chunk.
+    """
+    new_leads = []
+    skipped = 0
+    bulk_headers = {
+        **headers,
+        "Prefer": "return=representation,resolution=ignore-duplicates,missing=default"
+    }
+
+    for start in range(0, len(rows), SYNC_CHUNK_SIZE):
+        chunk, already_synced = await drop_existing_ids(client, rest_url, headers, rows[start:start + SYNC_CHUNK_SIZE])
+        skipped += already_synced
+        if not chunk:
+            continue
+        # Rows differ in which optional keys they carry; listing the union lets
+        # missing=default fill the gaps instead of writing NULLs.
+        columns = sorted({key for row in chunk for key in row})
+        try:
+            response = await client.post(
+                rest_url,
+                params={"on_conflict": "email", "columns": ",".join(columns)},
+                headers=bulk_headers,
+                json=chunk
+            )
+        except Exception as e:
+            print(f"[Sync] Bulk insert of {len(chunk)} leads failed: {e}. Retrying one by one.")
+            saved, rejected = await insert_leads_individually(client, rest_url, headers, chunk)
+            new_leads.extend(saved)
+            skipped += rejected
+            continue
+
+        print(f"   📡 Bulk result ({len(chunk)} leads): {response.status_code}")
+        if response.status_code not in [201, 200]:
+            print(f"DB REJECTED chunk ({response.status_code}): {response.text}. Retrying one by one.")
+            saved, rejected = await insert_leads_individually(client, rest_url, headers, chunk)
+            new_leads.extend(saved)
+            skipped += rejected
+            continue
+
+        for row, saved in zip(chunk, match_inserted_rows(chunk, json_body(response))):
+            if saved is None:
+                print(f"Duplicate ignored: {row.get('name')}")
+                skipped += 1
+            else:
+                new_leads.append(saved)
+    return new_leads, skipped
+
+async def promote_leads(client: httpx.AsyncClient, rest_url: str, headers: dict, lead_ids: list[str]):
+    """
+    Sets status=Qualified on lead_ids with one id=in.(...) PATCH per chunk.
+    Returns (promoted_ids, failures) where failures maps lead id to error.
+    A chunk that fails is retried lead by lead.
+    """
+    promoted = []
+    failures = {}
+    patch_headers = {**headers, "Prefer": "return=representation"}
+
+    async def patch(ids: list[str]):
+        response = await client.patch(
+            rest_url,
+            params={"id": f"in.({','.join(ids)})", "select": "id"},
+            headers=patch_headers,
+            json={"status": "Qualified"}
+        )
+        if response.status_code not in [200, 204]:
+            raise Exception(f"{response.status_code}: {response.text}")
+        return {str(row["id"]) for row in json_body(response)}
+
+    for start in range(0, len(lead_ids), SYNC_CHUNK_SIZE):
+        chunk = lead_ids[start:start + SYNC_CHUNK_SIZE]
+        try:
+            updated = await patch(chunk)
+        except Exception as e:
+            print(f"[Background] Bulk promotion of {len(chunk)} leads failed: {e}. Retrying one by one.")
+            updated = set()
+            for lead_id in chunk:
+                try:
+                    updated |= await patch([lead_id])
+                except Exception as e:
+                    failures[lead_id] = f"promotion failed: {e}"
+        for lead_id in chunk:
+            if lead_id in updated:
+                promoted.append(lead_id)
+            elif lead_id not in failures:
+                failures[lead_id] = "promotion failed: lead not found"
+    return promoted, failures
+
+async def log_interactions(client: httpx.AsyncClient, rest_url: str, headers: dict, interactions: list[dict]):
+    """
+    Inserts interactions as chunked array POSTs. Returns failures keyed by
+    lead_id; a chunk that fails is retried one interaction at a time.
+    """
+    failures = {}
+    insert_headers = {**headers, "Prefer": "return=minimal"}
+
+    async def post(rows: list[dict]):
+        response = await client.post(rest_url, headers=insert_headers, json=rows)
+        if response.status_code not in [200, 201, 204]:
+            raise Exception(f"{response.status_code}: {response.text}")
+
+    for start in range(0, len(interactions), SYNC_CHUNK_SIZE):
+        chunk = interactions[start:start + SYNC_CHUNK_SIZE]
+        try:
+            await post(chunk)
+        except Exception as e:
+            print(f"[Background] Bulk insert of {len(chunk)} interactions failed: {e}. Retrying one by one.")
+            for interaction in chunk:
+                try:
+                    await post([interaction])
+                except Exception as e:
+                    failures[interaction["lead_id"]] = f"interaction failed: {e}"
+    return failures
+
+async def process_leads_background(new_leads: list[dict]) -> dict:
+    """
+    Handles enrichment and scoring of freshly synced leads as a background
+    task on the shared client. Leads scoring 40+ are promoted to Qualified
+    and every lead gets a Sync interaction, each written in bulk. Returns
+    {"qualified": [...], "failed": {lead_id: error}}.
+
+    Each step that succeeds is recorded on the lead dict ("promoted",
+    "interaction_logged") and steps already recorded are skipped, so a
+    retry of the same dicts only repeats what failed.
     """
     SUPABASE_URL = os.environ.get("SUPABASE_URL")
     SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
@@ -45,59 +267,41 @@ def process_leads_background(new_leads: list[dict]):
         "Authorization": f"Bearer {SUPABASE_KEY}",
         "Content-Type": "application/json"
     }
+    if not new_leads:
+        return {"qualified": [], "failed": {}}
 
-    with httpx.Client(timeout=30.0) as client:
-        for lead in new_leads:
-            try:
-                
-                score = calculate_lead_score(lead)
-                lead_name = lead.get("name") or "Unknown"
-                print(f"[Background] Scoring {lead_name}: {score}")
-                
-                
-                if score >= 40:
-                    client.patch(
-                        f"{SUPABASE_URL}/rest/v1/leads?id=eq.{lead['id']}",
-                        headers=headers,
-                        json={"status": "Qualified"}
-                    )
-                
-                
-                client.post(
-                    f"{SUPABASE_URL}/rest/v1/interactions",
-                    headers=headers,
-                    json={
-                        "lead_id": lead["id"],
-                        "type": "Sync",
-                        "summary": f"Lead initially captured with score: {score}"
-                    }
-                )
-                
-                print(f"[Background] Success for {lead_name}")
-                
-            except Exception as e:
-                print(f"[Background] Error processing {lead.get('name') or 'unknown'}: {e}")
-
-def calculate_wealth_metrics(lead_data: dict):
-    # 1. AUA Prediction: Converting ticket sizes to numeric values
-    ticket_map = {
-        "< 10L": 500000, 
-        "10L - 50L": 3000000, 
-        "50L - 1Cr": 7500000, 
-        "> 1Cr": 15000000
-    }
-    predicted_aua = ticket_map.get(lead_data.get("ticket_size"), 0)
-
-    # 2. Investor Readiness Score (0-100)
-    # Weighted logic: Intent (30%), Engagement (40%), Profile Completion (30%)
-    intent_weight = 30 if lead_data.get("intent") == "High" else 15
-    engagement_weight = int(lead_data.get("engagement_score", 1)) * 8  # Max 40
-    profile_weight = 30 if lead_data.get("email") and lead_data.get("phone") else 10
-    
-    readiness_score = intent_weight + engagement_weight + profile_weight
-
-    return {
-        "predicted_aua": predicted_aua,
-        "readiness_score": min(readiness_score, 100)
-    }
+    client = get_http_client()
+    scores = [int(score) for score in score_batch(to_columns(new_leads))["lead_score"]]
+    qualified_ids = [str(lead["id"]) for lead, score in zip(new_leads, scores) if score >= 40 and not lead.get("promoted")]
+
+    promoted, failures = await promote_leads(client, f"{SUPABASE_URL}/rest/v1/leads", headers, qualified_ids)
+    for lead in new_leads:
+        if str(lead["id"]) in promoted:
+            lead["promoted"] = True
+    for lead_id in promoted:
+        lead_aggregates.apply({"id": lead_id, "status": "Qualified"})
+        reminder_index.apply({"id": lead_id, "status": "Qualified"})
+        lead_cache.apply({"id": lead_id, "status": "Qualified"})
+        hub.publish_lead(lead_id, {"status": "Qualified"})
+
+    interactions = [
+        {
+            "lead_id": lead["id"],
+            "type": "Sync",
+            "summary": f"Lead initially captured with score: {score}"
+        }
+        for lead, score in zip(new_leads, scores)
+        if not lead.get("interaction_logged")
+    ]
+    interaction_failures = await log_interactions(client, f"{SUPABASE_URL}/rest/v1/interactions", headers, interactions)
+    for lead in new_leads:
+        if lead["id"] not in interaction_failures:
+            lead["interaction_logged"] = True
+    for lead_id, error in interaction_failures.items():
+        lead_id = str(lead_id)
+        failures[lead_id] = f"{failures[lead_id]}; {error}" if lead_id in failures else error
 
+    for lead_id, error in failures.items():
+        print(f"[Background] Error processing lead {lead_id}: {error}")
+    print(f"[Background] Scored {len(new_leads)} leads, {len(promoted)} qualified, {len(failures)} failed.")
+    return {"qualified": promoted, "failed": failures}